@@ -0,0 +1,122 @@
+"""
+Benchmark copying a CSV into SQLite through CopyPipeline.
+
+Compares the pipeline, streaming chunks into bulk inserts, with a full read
+of the CSV followed by one INSERT per row. Peak memory is measured with
+tracemalloc, so it covers Python allocations only.
+
+    python -m benchmarks.bench_copy_pipeline --rows 20000 --chunksize 5000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, insert, select
+
+from brokers.storage.pandas_stoage_broker.pandas_csv_storage_broker import (
+    PandasCSVStorageBroker, )
+from brokers.storage.sqlalchemy_stoage_broker.sqlalchemy_storage_broker import (
+    SQLAlchemyStorageBroker, )
+from models.storage.pandas_broker_models.pandas_csv_connect_params import (
+    PandasCSVConnectParams, )
+from models.storage.pandas_broker_models.pandas_csv_read_params import (
+    PandasCSVReadParams, )
+from models.storage.pandas_broker_models.pandas_csv_stream_read_params import (
+    PandasCSVStreamReadParams, )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_bulk_create_params import (
+    SQLAlchemyBulkCreateParams, )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_connect_params import (
+    SQLAlchemyConnectParams, )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_create_params import (
+    SQLAlchemyCreateParams, )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_read_params import (
+    SQLAlchemyReadParams, )
+from services.storage.copy_pipeline import CopyPipeline
+
+
+def make_csv(path, rows):
+    ids = np.arange(rows)
+    pd.DataFrame({
+        "id": ids,
+        "name": [f"user{i}" for i in ids],
+        "email": [f"user{i}@example.com" for i in ids],
+    }).to_csv(path, index=False)
+
+
+def connect(tmp, label):
+    csv_broker = PandasCSVStorageBroker()
+    csv_broker.connect(
+        PandasCSVConnectParams(file_path=os.path.join(tmp, "data.csv"),
+                               lazy=True))
+    sql_broker = SQLAlchemyStorageBroker()
+    sql_broker.connect(
+        SQLAlchemyConnectParams(
+            database_url=f"sqlite:///{os.path.join(tmp, label)}.db"))
+    metadata = MetaData()
+    table = Table("users", metadata, Column("id", Integer, primary_key=True),
+                  Column("name", String), Column("email", String))
+    metadata.create_all(sql_broker.engine)
+    return csv_broker, sql_broker, table
+
+
+def row_inserts(tmp, chunksize):
+    # Read the whole CSV, then insert it one row at a time
+    csv_broker, sql_broker, table = connect(tmp, "rows")
+    df = csv_broker.read(PandasCSVReadParams())
+    for row in df.astype(object).to_dict("records"):
+        sql_broker.create(SQLAlchemyCreateParams(insert(table).values(**row)))
+    return sql_broker, table
+
+
+def pipeline(tmp, chunksize):
+    csv_broker, sql_broker, table = connect(tmp, "pipeline")
+    CopyPipeline(
+        source_broker=csv_broker,
+        target_broker=sql_broker,
+        read_params=PandasCSVStreamReadParams(chunksize=chunksize),
+        create_params=lambda df: SQLAlchemyBulkCreateParams(table=table,
+                                                            rows=df),
+    ).run()
+    return sql_broker, table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--chunksize", type=int, default=5_000)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        make_csv(os.path.join(tmp, "data.csv"), args.rows)
+        for label, run in (("rows", row_inserts), ("pipeline", pipeline)):
+            tracemalloc.start()
+            began = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                sql_broker, table = run(tmp, args.chunksize)
+            elapsed = time.perf_counter() - began
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            count = sql_broker.read(
+                SQLAlchemyReadParams(select(func.count()).select_from(table)))
+            assert count[0][0] == args.rows
+            sql_broker.close()
+            results[label] = (elapsed, peak)
+
+    print(f"Copying a {args.rows}-row CSV into SQLite "
+          f"({args.chunksize} rows per chunk)")
+    for label, (elapsed, peak) in results.items():
+        print(f"  {label:<9} {elapsed:8.3f}s "
+              f"({args.rows / elapsed:10.0f} rows/s), "
+              f"peak {peak / 2**20:7.1f} MiB")
+    print(f"  speedup   {results['rows'][0] / results['pipeline'][0]:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark import times with `python -X importtime`.
+
+Imports each broker module, and the broker registry alone, in a fresh
+interpreter, and reports the cumulative import time, how much of it went to
+pandas and SQLAlchemy, and whether they were imported at all. The params
+models should import neither.
+
+    python -m benchmarks.bench_import_time --repeat 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+TARGETS = {
+    "registry": "brokers.storage.broker_registry",
+    "csv": "brokers.storage.pandas_stoage_broker.pandas_csv_storage_broker",
+    "partitioned_csv": "brokers.storage.pandas_stoage_broker.partitioned_csv_storage_broker",
+    "numpy": "brokers.storage.numpy_stoage_broker.numpy_column_storage_broker",
+    "sqlalchemy": "brokers.storage.sqlalchemy_stoage_broker.sqlalchemy_storage_broker",
+    "async_sqlalchemy": "brokers.storage.sqlalchemy_stoage_broker.async_sqlalchemy_storage_broker",
+    "csv params": "models.storage.pandas_broker_models.pandas_csv_read_params",
+    "sql params": "models.storage.sqlalchemy_broker_models.sqlalchemy_read_params",
+}
+HEAVY = ("pandas", "sqlalchemy")
+
+# "import time:  self [us] | cumulative | imported package"
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module):
+    """
+    Cumulative microseconds of `module` and of each top-level package it
+    pulled in, from one fresh interpreter.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root,
+        env={**os.environ, "PYTHONPATH": root},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            _, cumulative, _, name = match.groups()
+            times[name] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Import times, median of {args.repeat} fresh interpreters")
+    print(f"  {'':<17} {'total':>9} " + " ".join(f"{name:>11}" for name in HEAVY))
+    for label, module in TARGETS.items():
+        runs = [import_times(module) for _ in range(args.repeat)]
+        total = statistics.median(run[module] for run in runs)
+        heavy = []
+        for name in HEAVY:
+            if name in runs[0]:
+                heavy.append(f"{statistics.median(run[name] for run in runs) / 1000:9.1f}ms")
+            else:
+                heavy.append(f"{'-':>11}")
+        print(f"  {label:<17} {total / 1000:7.1f}ms " + " ".join(heavy))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark NumpyColumnStorageBroker against PandasCSVStorageBroker.
+
+Times connect plus a full read, a read of one column, and single-row
+appends, on the same table stored both ways.
+
+    python -m benchmarks.bench_numpy_column_store --rows 1000000 --inserts 100
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from brokers.storage.numpy_stoage_broker.numpy_column_storage_broker import (
+    NumpyColumnStorageBroker, )
+from brokers.storage.pandas_stoage_broker.pandas_csv_storage_broker import (
+    PandasCSVStorageBroker, )
+from models.storage.numpy_broker_models.numpy_column_connect_params import (
+    NumpyColumnConnectParams, )
+from models.storage.numpy_broker_models.numpy_column_create_params import (
+    NumpyColumnCreateParams, )
+from models.storage.numpy_broker_models.numpy_column_read_params import (
+    NumpyColumnReadParams, )
+from models.storage.pandas_broker_models.pandas_csv_connect_params import (
+    PandasCSVConnectParams, )
+from models.storage.pandas_broker_models.pandas_csv_create_params import (
+    PandasCSVCreateParams, )
+from models.storage.pandas_broker_models.pandas_csv_read_params import (
+    PandasCSVReadParams, )
+
+
+def make_frame(rows):
+    ids = np.arange(rows)
+    return pd.DataFrame({
+        "id": ids,
+        "score": np.random.default_rng(0).random(rows),
+        "status": np.array(["new", "active", "closed"])[ids % 3],
+    })
+
+
+def new_row(i):
+    return [{"id": i, "score": 0.5, "status": "new"}]
+
+
+def timed(run):
+    began = time.perf_counter()
+    result = run()
+    return time.perf_counter() - began, result
+
+
+def bench_csv(directory, df, inserts):
+    path = os.path.join(directory, "data.csv")
+    df.to_csv(path, index=False)
+
+    def full_read():
+        broker = PandasCSVStorageBroker()
+        broker.connect(PandasCSVConnectParams(file_path=path))
+        return broker, broker.read(PandasCSVReadParams(read_only=True))
+
+    full, (broker, _) = timed(full_read)
+    column, _ = timed(lambda: broker.read(
+        PandasCSVReadParams(read_only=True, filter_func=lambda d: d["score"])))
+    append, _ = timed(lambda: [
+        broker.create(PandasCSVCreateParams(data=new_row(len(df) + i)))
+        for i in range(inserts)
+    ])
+    return full, column, append
+
+
+def bench_numpy(directory, df, inserts):
+    store = os.path.join(directory, "store")
+    writer = NumpyColumnStorageBroker()
+    writer.connect(NumpyColumnConnectParams(directory=store))
+    writer.create(NumpyColumnCreateParams(data=df))
+
+    def full_read():
+        broker = NumpyColumnStorageBroker()
+        broker.connect(NumpyColumnConnectParams(directory=store))
+        return broker, broker.read(NumpyColumnReadParams(read_only=True))
+
+    full, (broker, _) = timed(full_read)
+    column, _ = timed(lambda: broker.read(
+        NumpyColumnReadParams(columns=["score"], read_only=True)))
+    append, _ = timed(lambda: [
+        broker.create(NumpyColumnCreateParams(data=new_row(len(df) + i)))
+        for i in range(inserts)
+    ])
+    return full, column, append
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--inserts", type=int, default=100)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["csv"] = bench_csv(tmp, df, args.inserts)
+            results["numpy"] = bench_numpy(tmp, df, args.inserts)
+
+    print(f"{args.rows}-row table, {args.inserts} single-row appends")
+    print(f"  {'':<6} {'connect+read':>13} {'one column':>11} {'ms/append':>10}")
+    for label, (full, column, append) in results.items():
+        print(f"  {label:<6} {full:12.3f}s {column:10.4f}s "
+              f"{append / args.inserts * 1000:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark N single-row inserts through PandasCSVStorageBroker.create.
+
+Compares the append-only write path with the previous behaviour, which
+concatenated onto the frame and rewrote the whole CSV on every insert.
+
+    python -m benchmarks.bench_pandas_csv_create --rows 200000 --inserts 100
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from brokers.storage.pandas_stoage_broker.pandas_csv_storage_broker import (
+    PandasCSVStorageBroker, )
+from models.storage.pandas_broker_models.pandas_csv_connect_params import (
+    PandasCSVConnectParams, )
+from models.storage.pandas_broker_models.pandas_csv_create_params import (
+    PandasCSVCreateParams, )
+
+
+def make_csv(path, rows):
+    ids = np.arange(rows)
+    pd.DataFrame({
+        "id": ids,
+        "name": [f"user{i}" for i in ids],
+        "email": [f"user{i}@example.com" for i in ids],
+    }).to_csv(path, index=False)
+
+
+def new_row(i):
+    return [{"id": i, "name": f"new{i}", "email": f"new{i}@example.com"}]
+
+
+def rewrite_inserts(path, inserts, start):
+    # The previous create: concat onto the frame, then rewrite the whole file
+    df = pd.read_csv(path)
+    began = time.perf_counter()
+    for i in range(inserts):
+        df = pd.concat([df, pd.DataFrame(new_row(start + i))],
+                       ignore_index=True)
+        df.to_csv(path, index=False)
+    return time.perf_counter() - began
+
+
+def append_inserts(path, inserts, start):
+    broker = PandasCSVStorageBroker()
+    with contextlib.redirect_stdout(io.StringIO()):
+        broker.connect(PandasCSVConnectParams(file_path=path))
+        began = time.perf_counter()
+        for i in range(inserts):
+            broker.create(PandasCSVCreateParams(data=new_row(start + i)))
+        elapsed = time.perf_counter() - began
+    assert len(broker.df) == start + inserts
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--inserts", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        results = {}
+        for label, run in (("rewrite", rewrite_inserts),
+                           ("append", append_inserts)):
+            make_csv(path, args.rows)
+            results[label] = run(path, args.inserts, args.rows)
+            assert len(pd.read_csv(path)) == args.rows + args.inserts
+
+    print(f"{args.inserts} single-row inserts into a {args.rows}-row CSV")
+    for label, elapsed in results.items():
+        print(f"  {label:<8} {elapsed:8.3f}s "
+              f"({elapsed / args.inserts * 1000:8.2f} ms/insert)")
+    print(f"  speedup  {results['rewrite'] / results['append']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark PandasCSVStorageBroker.read with and without read_only.
+
+Each mode runs in its own process so peak RSS is measured independently.
+Process RSS peaks while the CSV is parsed, so the extra memory allocated
+during reads is also reported, traced with tracemalloc. The filter only
+inspects a few rows, which is where the defensive full copy made by the
+default read dominates.
+
+    python -m benchmarks.bench_pandas_csv_read --rows 1000000 --reads 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from brokers.storage.pandas_stoage_broker.pandas_csv_storage_broker import (
+    PandasCSVStorageBroker, )
+from models.storage.pandas_broker_models.pandas_csv_connect_params import (
+    PandasCSVConnectParams, )
+from models.storage.pandas_broker_models.pandas_csv_read_params import (
+    PandasCSVReadParams, )
+
+
+def make_csv(path, rows):
+    ids = np.arange(rows)
+    pd.DataFrame({
+        "id": ids,
+        "score": np.random.default_rng(0).random(rows),
+        "name": [f"user{i}" for i in ids],
+    }).to_csv(path, index=False)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def first_rows(df):
+    return df.head(10)
+
+
+def run_child(path, reads, read_only):
+    broker = PandasCSVStorageBroker()
+    params = PandasCSVReadParams(filter_func=first_rows, read_only=read_only)
+    with contextlib.redirect_stdout(io.StringIO()):
+        broker.connect(PandasCSVConnectParams(file_path=path))
+        loaded_rss = peak_rss_mb()
+        began = time.perf_counter()
+        for _ in range(reads):
+            broker.read(params)
+        elapsed = time.perf_counter() - began
+        # Trace separately, tracemalloc slows down the timed loop
+        tracemalloc.start()
+        results = [broker.read(params) for _ in range(3)]
+        read_peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        del results
+    print(
+        json.dumps({
+            "reads_per_s": reads / elapsed,
+            "loaded_rss_mb": loaded_rss,
+            "peak_rss_mb": peak_rss_mb(),
+            "read_peak_mb": read_peak,
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--reads", type=int, default=50)
+    parser.add_argument("--child", choices=["copy", "read_only"])
+    parser.add_argument("--path")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.path, args.reads, args.child == "read_only")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        make_csv(path, args.rows)
+        results = {}
+        for mode in ("copy", "read_only"):
+            out = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_pandas_csv_read",
+                    "--child", mode, "--path", path, "--reads",
+                    str(args.reads)
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results[mode] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{args.reads} reads of the first 10 rows of a {args.rows}-row CSV")
+    for mode, r in results.items():
+        print(f"  {mode:<10} {r['reads_per_s']:10.1f} reads/s   "
+              f"RSS after load {r['loaded_rss_mb']:8.1f} MiB   "
+              f"peak {r['peak_rss_mb']:8.1f} MiB   "
+              f"allocated per read {r['read_peak_mb'] / 3:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
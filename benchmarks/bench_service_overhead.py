@@ -0,0 +1,82 @@
+"""
+Benchmark the per-call overhead IStorageService adds on top of its broker.
+
+Uses a broker whose methods do nothing, so the timings are the cost of the
+service's validation and dispatch alone. Each call is repeated with a tiny
+payload and with a large DataFrame payload; the overhead should not depend
+on the payload size.
+
+    python -m benchmarks.bench_service_overhead --calls 200000 --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from brokers.storage.i_storage_broker import IStorageBroker
+from models.storage.pandas_broker_models.pandas_csv_connect_params import (
+    PandasCSVConnectParams, )
+from models.storage.pandas_broker_models.pandas_csv_create_params import (
+    PandasCSVCreateParams, )
+from models.storage.pandas_broker_models.pandas_csv_delete_params import (
+    PandasCSVDeleteParams, )
+from models.storage.pandas_broker_models.pandas_csv_read_params import (
+    PandasCSVReadParams, )
+from models.storage.pandas_broker_models.pandas_csv_update_params import (
+    PandasCSVUpdateParams, )
+from services.storage.simple_storage_service import SimpleStorageService
+
+
+class NullBroker(IStorageBroker):
+
+    def connect(self, params: PandasCSVConnectParams):
+        return None
+
+    def create(self, params: PandasCSVCreateParams):
+        return None
+
+    def read(self, params: PandasCSVReadParams):
+        return None
+
+    def update(self, params: PandasCSVUpdateParams):
+        return None
+
+    def delete(self, params: PandasCSVDeleteParams):
+        return None
+
+
+def time_calls(create, params, calls):
+    began = time.perf_counter()
+    for _ in range(calls):
+        create(params)
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    broker = NullBroker()
+    service = SimpleStorageService(storage_broker=broker)
+    payloads = {
+        "1 row": PandasCSVCreateParams(data=[{"id": 1}]),
+        f"{args.rows} rows": PandasCSVCreateParams(data=pd.DataFrame({
+            "id": np.arange(args.rows),
+            "name": [f"user{i}" for i in range(args.rows)],
+        })),
+    }
+
+    print(f"{args.calls} create calls per path")
+    for label, params in payloads.items():
+        direct = time_calls(broker.create, params, args.calls)
+        through = time_calls(service.create, params, args.calls)
+        overhead = (through - direct) / args.calls * 1e9
+        print(f"  {label:<14} broker {direct:7.3f}s  service {through:7.3f}s"
+              f"  overhead {overhead:8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
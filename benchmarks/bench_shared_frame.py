@@ -0,0 +1,102 @@
+"""
+Benchmark worker start-up with a shared-memory frame.
+
+Compares `--workers` brokers each parsing the CSV on connect with brokers
+attaching to the frame one publishing broker put in shared memory. Also
+reports the bytes each worker's frame holds outside shared memory.
+
+    python -m benchmarks.bench_shared_frame --rows 1000000 --workers 16
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from brokers.storage.pandas_stoage_broker.pandas_csv_storage_broker import (
+    PandasCSVStorageBroker, )
+from models.storage.pandas_broker_models.pandas_csv_connect_params import (
+    PandasCSVConnectParams, )
+
+
+def make_csv(path, rows):
+    ids = np.arange(rows)
+    pd.DataFrame({
+        "id": ids,
+        "score": np.random.default_rng(0).random(rows),
+        "status": np.array(["new", "active", "closed"])[ids % 3],
+    }).to_csv(path, index=False)
+
+
+def private_bytes(df):
+    # Columns backed by a writable array of their own live in this process
+    total = 0
+    for _, column in df.items():
+        values = column.array
+        array = values.codes if hasattr(values, "codes") else column.to_numpy()
+        if array.flags.writeable:
+            total += column.memory_usage(index=False, deep=True)
+    return total
+
+
+def connect_workers(path, workers, **options):
+    brokers = []
+    began = time.perf_counter()
+    for _ in range(workers):
+        broker = PandasCSVStorageBroker()
+        broker.connect(PandasCSVConnectParams(file_path=path, **options))
+        brokers.append(broker)
+    elapsed = time.perf_counter() - began
+    return brokers, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    dtypes = {"status": "category"}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        make_csv(path, args.rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            parsing, parse_time = connect_workers(path,
+                                                  args.workers,
+                                                  dtypes=dtypes)
+            publisher = PandasCSVStorageBroker()
+            began = time.perf_counter()
+            publisher.connect(
+                PandasCSVConnectParams(file_path=path,
+                                       dtypes=dtypes,
+                                       shared_memory="bench-shared-frame"))
+            publish_time = time.perf_counter() - began
+            attached, attach_time = connect_workers(
+                path,
+                args.workers,
+                shared_memory="bench-shared-frame",
+                shared_memory_mode="attach")
+        results = {
+            "parse": (parse_time, private_bytes(parsing[0].df)),
+            "attach": (attach_time, private_bytes(attached[0].df)),
+        }
+        assert attached[0].df.equals(parsing[0].df)
+        for broker in attached:
+            broker.close()
+        publisher.close()
+
+    print(f"{args.workers} workers connecting to a {args.rows}-row CSV "
+          f"(publishing took {publish_time:.3f}s)")
+    for label, (elapsed, held) in results.items():
+        print(f"  {label:<7} {elapsed:8.3f}s "
+              f"({elapsed / args.workers * 1000:8.2f} ms/worker), "
+              f"{held / 2**20:7.1f} MiB private per worker")
+    print(f"  speedup {results['parse'][0] / results['attach'][0]:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
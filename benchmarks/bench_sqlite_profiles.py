@@ -0,0 +1,161 @@
+"""
+Benchmark SQLAlchemyStorageBroker on SQLite across sqlite_profile settings.
+
+For each profile, times single-row committed inserts, a bulk import of
+`--rows` rows in commits of `--batch` rows (also inside bulk_load()), and
+counts the point reads `--readers` threads complete in `--seconds` while a
+writer keeps committing single rows. With the default rollback journal the
+readers block on the writer; their "database is locked" errors are counted
+separately.
+
+    python -m benchmarks.bench_sqlite_profiles --rows 100000 --readers 4
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, insert, select
+from sqlalchemy.exc import OperationalError
+
+from brokers.storage.sqlalchemy_stoage_broker.sqlalchemy_storage_broker import (
+    SQLAlchemyStorageBroker, )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_bulk_create_params import (
+    SQLAlchemyBulkCreateParams, )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_connect_params import (
+    SQLAlchemyConnectParams, )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_create_params import (
+    SQLAlchemyCreateParams, )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_read_params import (
+    SQLAlchemyReadParams, )
+
+PROFILES = (None, "durable", "fast")
+
+metadata = MetaData()
+items = Table(
+    "items",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+)
+
+
+def open_broker(path, profile):
+    broker = SQLAlchemyStorageBroker()
+    broker.connect(
+        SQLAlchemyConnectParams(database_url=f"sqlite:///{path}",
+                                session_scope="operation",
+                                pool_timeout=60,
+                                sqlite_profile=profile))
+    return broker
+
+
+def rows(start, count):
+    return ({"id": i, "name": f"item {i}"} for i in range(start, start + count))
+
+
+def single_inserts(broker, start, count):
+    began = time.perf_counter()
+    for i in range(start, start + count):
+        broker.create(
+            SQLAlchemyCreateParams(
+                statement=insert(items).values(id=i, name=f"item {i}")))
+    return count / (time.perf_counter() - began)
+
+
+def bulk_import(broker, start, count, batch):
+    began = time.perf_counter()
+    broker.create(
+        SQLAlchemyBulkCreateParams(table=items,
+                                   rows=rows(start, count),
+                                   batch_size=batch,
+                                   single_transaction=False))
+    return count / (time.perf_counter() - began)
+
+
+def concurrent_reads(broker, start, readers, seconds):
+    stop = threading.Event()
+    counts = {"reads": 0, "locked": 0, "writes": 0}
+    lock = threading.Lock()
+
+    def read_loop(seed):
+        reads = locked = 0
+        i = seed
+        while not stop.is_set():
+            i = (i * 7919 + 1) % start
+            try:
+                broker.read(
+                    SQLAlchemyReadParams(
+                        statement=select(items).where(items.c.id == i)))
+                reads += 1
+            except OperationalError:
+                locked += 1
+        with lock:
+            counts["reads"] += reads
+            counts["locked"] += locked
+
+    def write_loop():
+        i = start
+        while not stop.is_set():
+            try:
+                broker.create(
+                    SQLAlchemyCreateParams(
+                        statement=insert(items).values(id=i, name="new")))
+                i += 1
+            except OperationalError:
+                pass
+        counts["writes"] = i - start
+
+    threads = [threading.Thread(target=write_loop)]
+    threads += [
+        threading.Thread(target=read_loop, args=(seed, ))
+        for seed in range(1, readers + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {key: value / seconds for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--inserts", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    print(f"SQLite profiles: {args.inserts} single-row inserts, "
+          f"{args.rows}-row import in {args.batch}-row commits, "
+          f"{args.readers} readers against one writer for {args.seconds}s")
+    print(f"  {'profile':<9} {'inserts/s':>10} {'import/s':>10} "
+          f"{'bulk_load/s':>12} {'reads/s':>9} {'locked/s':>9} {'writes/s':>9}")
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            broker = open_broker(path, profile)
+            metadata.create_all(broker.engine)
+            inserts = single_inserts(broker, 0, args.inserts)
+            start = args.inserts
+            imported = bulk_import(broker, start, args.rows, args.batch)
+            start += args.rows
+            with broker.bulk_load():
+                bulk_loaded = bulk_import(broker, start, args.rows, args.batch)
+            start += args.rows
+            concurrent = concurrent_reads(broker, start, args.readers,
+                                          args.seconds)
+            broker.close()
+        print(f"  {profile or 'default':<9} {inserts:10.0f} {imported:10.0f} "
+              f"{bulk_loaded:12.0f} {concurrent['reads']:9.0f} "
+              f"{concurrent['locked']:9.0f} {concurrent['writes']:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Per-operation metrics shared by every storage broker.
+
+Broker methods decorated with `instrumented` record an OperationRecord for
+each call: the operation name, its latency, the rows it returned or
+affected, and any error raised. `broker.metrics.snapshot()` summarises them
+per operation. Hooks added with `broker.metrics.add_hook` receive every
+record, so the numbers can be exported to any collector.
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OperationRecord:
+    broker: str
+    operation: str
+    duration: float  # Seconds
+    rows: Optional[int] = None
+    error: Optional[BaseException] = None
+
+
+class OperationStats:
+    """
+    Counters for one operation, plus the latest `sample_size` latencies
+    the percentiles are computed from.
+    """
+
+    def __init__(self, sample_size):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_duration = 0.0
+        self._latencies = deque(maxlen=sample_size)
+
+    def add(self, record: OperationRecord):
+        self.count += 1
+        self.total_duration += record.duration
+        self._latencies.append(record.duration)
+        if record.error is not None:
+            self.errors += 1
+        if record.rows is not None:
+            self.rows += record.rows
+
+    def summary(self):
+        latencies = sorted(self._latencies)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "mean": self.total_duration / self.count if self.count else 0.0,
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99),
+        }
+
+
+class BrokerMetrics:
+
+    def __init__(self, sample_size=1024):
+        self.sample_size = sample_size
+        self._stats = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[OperationRecord], None]):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[OperationRecord], None]):
+        self._hooks.remove(hook)
+
+    def record(self, record: OperationRecord):
+        with self._lock:
+            stats = self._stats.get(record.operation)
+            if stats is None:
+                stats = self._stats[record.operation] = OperationStats(
+                    self.sample_size)
+            stats.add(record)
+        for hook in list(self._hooks):
+            try:
+                hook(record)
+            except Exception:
+                # A broken exporter must never fail the storage operation
+                logger.exception("Metrics hook %r failed", hook)
+
+    def snapshot(self):
+        """
+        Summary per operation: count, errors, rows, and mean/p50/p95/p99
+        latency in seconds.
+        """
+        with self._lock:
+            return {
+                operation: stats.summary()
+                for operation, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+class InstrumentedBroker:
+    """
+    Mixin giving a broker its `metrics`, created on first use so broker
+    subclasses don't need to call a base __init__.
+    """
+
+    @property
+    def metrics(self) -> BrokerMetrics:
+        metrics = self.__dict__.get("_metrics")
+        if metrics is None:
+            metrics = self.__dict__.setdefault("_metrics", BrokerMetrics())
+        return metrics
+
+
+def instrumented(method):
+    """
+    Record latency, rows and errors of a broker method in `self.metrics`.
+    Works for sync and async methods. Streaming reads are timed until their
+    generator is returned, not until it is exhausted.
+    """
+    operation = method.__name__
+
+    if inspect.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await method(self, *args, **kwargs)
+            except BaseException as e:
+                _record(self, operation, started, None, e)
+                raise
+            _record(self, operation, started, result, None)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except BaseException as e:
+            _record(self, operation, started, None, e)
+            raise
+        _record(self, operation, started, result, None)
+        return result
+
+    return wrapper
+
+
+def _record(broker, operation, started, result, error):
+    broker.metrics.record(
+        OperationRecord(
+            broker=type(broker).__name__,
+            operation=operation,
+            duration=time.perf_counter() - started,
+            rows=_row_count(result),
+            error=error,
+        ))
+
+
+def _row_count(result):
+    # Writes return the number of rows they affected, reads their rows
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, int):
+        return result
+    if hasattr(result, "__len__") and not isinstance(result, (str, bytes)):
+        return len(result)
+    return None
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
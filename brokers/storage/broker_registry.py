@@ -0,0 +1,191 @@
+"""
+Storage brokers and their params classes, looked up by name or URL.
+
+    broker = connect("csv://data.csv", lazy=True)
+    ReadParams = params_class("csv", "read")
+    broker = broker_class("sqlite:///app.db")()
+
+Entries name their classes as "module:Class" strings, and a module is only
+imported the first time one of its classes is asked for, so a process that
+only talks to a database never imports pandas.
+"""
+import importlib
+import inspect
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+PARAMS_KINDS = ("connect", "create", "read", "update", "delete")
+
+
+@dataclass
+class BrokerEntry:
+    name: str
+    broker: str  # "module:Class"
+    params: Dict[str, str]  # Params kind -> "module:Class"
+    schemes: Tuple[str, ...] = ()
+    url_field: Optional[str] = None  # Connect params field a URL's location goes in
+    keep_scheme: bool = False  # Pass the whole URL, not what follows "://"
+    classes: Dict[str, type] = field(default_factory=dict, repr=False)
+
+
+_entries = {}
+_schemes = {}
+_lock = threading.Lock()
+
+
+def register(name, broker, params, schemes=(), url_field=None, keep_scheme=False):
+    """
+    Register a broker under `name` and the URL `schemes` it serves.
+    `params` maps each of PARAMS_KINDS to its params class.
+    """
+    missing = [kind for kind in PARAMS_KINDS if kind not in params]
+    if missing:
+        raise ValueError(f"Broker '{name}' has no params class for {missing}")
+    if schemes and url_field is None:
+        raise ValueError(f"Broker '{name}' serves URLs but has no url_field")
+    entry = BrokerEntry(
+        name=name,
+        broker=broker,
+        params=dict(params),
+        schemes=tuple(schemes),
+        url_field=url_field,
+        keep_scheme=keep_scheme,
+    )
+    with _lock:
+        _entries[name] = entry
+        for scheme in entry.schemes:
+            _schemes[scheme] = entry
+    return entry
+
+
+def resolve(name_or_url):
+    """
+    The entry registered under a name, or serving a URL's scheme. A scheme
+    with a driver ("postgresql+psycopg2") falls back to its dialect.
+    """
+    if "://" not in name_or_url:
+        try:
+            return _entries[name_or_url]
+        except KeyError:
+            raise KeyError(
+                f"No broker named '{name_or_url}', expected one of "
+                f"{sorted(_entries)}"
+            ) from None
+    scheme = name_or_url.split("://", 1)[0].lower()
+    entry = _schemes.get(scheme) or _schemes.get(scheme.split("+", 1)[0])
+    if entry is None:
+        raise KeyError(f"No broker serves '{scheme}://' URLs")
+    return entry
+
+
+def broker_class(name_or_url):
+    return _load(resolve(name_or_url), "broker")
+
+
+def params_class(name_or_url, kind):
+    if kind not in PARAMS_KINDS:
+        raise ValueError(f"Unknown params kind '{kind}', expected one of {PARAMS_KINDS}")
+    return _load(resolve(name_or_url), kind)
+
+
+def connect_params(url, **options):
+    """
+    The connect params for `url`, with `options` as their other fields.
+    """
+    if "://" not in url:
+        raise ValueError(f"Expected a URL like 'csv://data.csv', got '{url}'")
+    entry = resolve(url)
+    location = url if entry.keep_scheme else url.split("://", 1)[1]
+    return params_class(url, "connect")(**{entry.url_field: location}, **options)
+
+
+def connect(url, **options):
+    """
+    A broker connected to `url`. Async brokers have to be connected by
+    awaiting `broker_class(url)().connect(connect_params(url))` instead.
+    """
+    params = connect_params(url, **options)
+    broker = broker_class(url)()
+    if inspect.iscoroutinefunction(broker.connect):
+        raise TypeError(f"'{url}' is served by an async broker; await its connect")
+    broker.connect(params)
+    return broker
+
+
+def _load(entry, kind):
+    cls = entry.classes.get(kind)
+    if cls is None:
+        path = entry.broker if kind == "broker" else entry.params[kind]
+        module_name, _, class_name = path.partition(":")
+        cls = getattr(importlib.import_module(module_name), class_name)
+        entry.classes[kind] = cls
+    return cls
+
+
+_PANDAS_MODELS = "models.storage.pandas_broker_models"
+_NUMPY_MODELS = "models.storage.numpy_broker_models"
+_SQLALCHEMY_MODELS = "models.storage.sqlalchemy_broker_models"
+
+register(
+    "csv",
+    "brokers.storage.pandas_stoage_broker.pandas_csv_storage_broker:PandasCSVStorageBroker",
+    {
+        kind: f"{_PANDAS_MODELS}.pandas_csv_{kind}_params:PandasCSV{kind.title()}Params"
+        for kind in PARAMS_KINDS
+    },
+    schemes=("csv",),
+    url_field="file_path",
+)
+register(
+    "partitioned_csv",
+    "brokers.storage.pandas_stoage_broker.partitioned_csv_storage_broker"
+    ":PartitionedCSVStorageBroker",
+    {
+        **{
+            kind: f"{_PANDAS_MODELS}.pandas_csv_{kind}_params:PandasCSV{kind.title()}Params"
+            for kind in PARAMS_KINDS
+        },
+        "connect": f"{_PANDAS_MODELS}.partitioned_csv_connect_params"
+        ":PartitionedCSVConnectParams",
+    },
+    schemes=("csv+partitioned",),
+    url_field="directory",
+)
+register(
+    "numpy",
+    "brokers.storage.numpy_stoage_broker.numpy_column_storage_broker"
+    ":NumpyColumnStorageBroker",
+    {
+        kind: f"{_NUMPY_MODELS}.numpy_column_{kind}_params:NumpyColumn{kind.title()}Params"
+        for kind in PARAMS_KINDS
+    },
+    schemes=("npy",),
+    url_field="directory",
+)
+register(
+    "sqlalchemy",
+    "brokers.storage.sqlalchemy_stoage_broker.sqlalchemy_storage_broker"
+    ":SQLAlchemyStorageBroker",
+    {
+        kind: f"{_SQLALCHEMY_MODELS}.sqlalchemy_{kind}_params:SQLAlchemy{kind.title()}Params"
+        for kind in PARAMS_KINDS
+    },
+    schemes=("sqlite", "postgresql", "mysql", "mariadb", "mssql", "oracle"),
+    url_field="database_url",
+    keep_scheme=True,
+)
+register(
+    "async_sqlalchemy",
+    "brokers.storage.sqlalchemy_stoage_broker.async_sqlalchemy_storage_broker"
+    ":AsyncSQLAlchemyStorageBroker",
+    _entries["sqlalchemy"].params,
+    schemes=(
+        "sqlite+aiosqlite",
+        "postgresql+asyncpg",
+        "mysql+aiomysql",
+        "mysql+asyncmy",
+    ),
+    url_field="database_url",
+    keep_scheme=True,
+)
@@ -0,0 +1,54 @@
+from abc import ABC, abstractmethod
+from typing import TypeVar, Generic
+
+from brokers.storage.broker_metrics import InstrumentedBroker
+from brokers.storage.i_storage_broker import TransactionNotSupportedError
+from models.storage.i_connect_params import IConnectParams
+from models.storage.i_create_params import ICreateParams
+from models.storage.i_read_params import IReadParams
+from models.storage.i_update_params import IUpdateParams
+from models.storage.i_delete_params import IDeleteParams
+
+TConnectParams = TypeVar('TConnectParams', bound=IConnectParams)
+TCreateParams = TypeVar('TCreateParams', bound=ICreateParams)
+TReadParams = TypeVar('TReadParams', bound=IReadParams)
+TUpdateParams = TypeVar('TUpdateParams', bound=IUpdateParams)
+TDeleteParams = TypeVar('TDeleteParams', bound=IDeleteParams)
+
+
+class IAsyncStorageBroker(InstrumentedBroker, ABC, Generic[
+    TConnectParams,
+    TCreateParams,
+    TReadParams,
+    TUpdateParams,
+    TDeleteParams,
+]):
+
+  @abstractmethod
+  async def connect(self, params: TConnectParams):
+    pass
+
+  @abstractmethod
+  async def create(self, params: TCreateParams):
+    pass
+
+  @abstractmethod
+  async def read(self, params: TReadParams):
+    pass
+
+  @abstractmethod
+  async def update(self, params: TUpdateParams):
+    pass
+
+  @abstractmethod
+  async def delete(self, params: TDeleteParams):
+    pass
+
+  def transaction(self):
+    """
+      Async context manager grouping the operations in its block into one
+      unit of work, committed when the block exits and rolled back if it
+      raises.
+      """
+    raise TransactionNotSupportedError(
+        f"{type(self).__name__} does not support transactions.")
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import TypeVar, Generic
 
+from brokers.storage.broker_metrics import InstrumentedBroker
 from models.storage.i_connect_params import IConnectParams
 from models.storage.i_create_params import ICreateParams
 from models.storage.i_read_params import IReadParams
@@ -14,7 +15,14 @@ TUpdateParams = TypeVar('TUpdateParams', bound=IUpdateParams)
 TDeleteParams = TypeVar('TDeleteParams', bound=IDeleteParams)
 
 
-class IStorageBroker(ABC, Generic[
+class TransactionNotSupportedError(NotImplementedError):
+  """
+    Raised by `transaction()` on brokers and services that can't group
+    operations into one unit of work.
+    """
+
+
+class IStorageBroker(InstrumentedBroker, ABC, Generic[
     TConnectParams,
     TCreateParams,
     TReadParams,
@@ -41,3 +49,25 @@ class IStorageBroker(ABC, Generic[
   @abstractmethod
   def delete(self, params: TDeleteParams):
     pass
+
+  def transaction(self):
+    """
+      Context manager grouping the operations in its block into one unit of
+      work, committed when the block exits and rolled back if it raises.
+      """
+    raise TransactionNotSupportedError(
+        f"{type(self).__name__} does not support transactions.")
+
+  def cache_key(self, params):
+    """
+      Hashable key identifying the result of `read(params)`, or None when the
+      result shouldn't be cached.
+      """
+    return None
+
+  def cache_tags(self, params):
+    """
+      Names of the data `params` reads or writes, used to invalidate cached
+      reads on writes. None stands for all of it.
+      """
+    return None
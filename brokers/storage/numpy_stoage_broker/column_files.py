@@ -0,0 +1,141 @@
+"""
+On-disk layout of the NumPy column store.
+
+A table directory holds `manifest.json` and, per column, a .npy file of its
+values. String columns are dictionary-encoded: the .npy file holds int32
+codes (-1 for missing values) into a dictionary file with one JSON string
+per line. The manifest records the row count and the size of each
+dictionary, and is replaced atomically last on every write, so it is the
+commit point: rows or bytes past what it records are leftovers of an
+interrupted append and are ignored, then cut off by the next one.
+
+Appends add to the end of the files and rewrite the shape in the .npy
+header in place, which np.save leaves room for.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+STRING = "string"  # Manifest dtype of dictionary-encoded columns
+CODE_DTYPE = np.dtype(np.int32)
+
+
+def read_manifest(directory):
+    """
+    The manifest of the table in `directory`, or None if it has none yet.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(
+            f"Unsupported manifest version {manifest.get('version')} "
+            f"in {directory}"
+        )
+    return manifest
+
+
+def write_manifest(directory, manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".manifest.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_array(path, rows, mmap_mode):
+    """
+    The first `rows` values of the .npy file at `path`.
+    """
+    if rows == 0:
+        # mmap can't map an empty file region
+        return np.load(path)[:0]
+    return np.load(path, mmap_mode=mmap_mode)[:rows]
+
+
+def write_array(path, values):
+    with open(path, "wb") as f:
+        np.save(f, np.ascontiguousarray(values))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def append_array(path, values, rows):
+    """
+    Append `values` after the first `rows` values of the .npy file at `path`.
+    """
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            _, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            _, _, dtype = np.lib.format.read_array_header_2_0(f)
+        if values.dtype != dtype:
+            raise TypeError(f"Can't append {values.dtype} values to {dtype} in {path}")
+        data_offset = f.tell()
+        f.seek(data_offset + rows * dtype.itemsize)
+        f.truncate()
+        f.write(np.ascontiguousarray(values).tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(_header(version, data_offset, dtype, rows + len(values)))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_dictionary(path, size):
+    """
+    The strings in the first `size` bytes of the dictionary file at `path`.
+    """
+    with open(path, "rb") as f:
+        data = f.read(size)
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def append_dictionary(path, values, size):
+    """
+    Append `values` after the first `size` bytes of the dictionary file at
+    `path`, returning its new size.
+    """
+    data = "".join(json.dumps(value) + "\n" for value in values).encode("utf-8")
+    with open(path, "ab") as f:
+        f.truncate(size)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return size + len(data)
+
+
+def _header(version, data_offset, dtype, rows):
+    # The same header length as before, so the data doesn't move
+    prefix = len(np.lib.format.MAGIC_PREFIX) + 2 + (2 if version == (1, 0) else 4)
+    text = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": (rows,),
+        }
+    )
+    length = data_offset - prefix
+    if len(text) + 1 > length:
+        raise ValueError("The .npy header has no room left for the new shape")
+    text = text.ljust(length - 1) + "\n"
+    size = length.to_bytes(prefix - len(np.lib.format.MAGIC_PREFIX) - 2, "little")
+    return (
+        np.lib.format.MAGIC_PREFIX
+        + bytes(version)
+        + size
+        + text.encode("latin1")
+    )
@@ -0,0 +1,383 @@
+import copy
+import logging
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from brokers.storage.broker_metrics import instrumented
+from brokers.storage.i_storage_broker import IStorageBroker
+from brokers.storage.numpy_stoage_broker import column_files
+from models.storage.numpy_broker_models.numpy_column_connect_params import (
+    NumpyColumnConnectParams,
+)
+from models.storage.numpy_broker_models.numpy_column_create_params import (
+    NumpyColumnCreateParams,
+)
+from models.storage.numpy_broker_models.numpy_column_read_params import (
+    NumpyColumnReadParams,
+)
+from models.storage.numpy_broker_models.numpy_column_update_params import (
+    NumpyColumnUpdateParams,
+)
+from models.storage.numpy_broker_models.numpy_column_delete_params import (
+    NumpyColumnDeleteParams,
+)
+
+logger = logging.getLogger(__name__)
+
+MMAP_MODES = ("r", "c", None)
+
+
+class NumpyColumnStorageBroker(
+    IStorageBroker[
+        NumpyColumnConnectParams,
+        NumpyColumnCreateParams,
+        NumpyColumnReadParams,
+        NumpyColumnUpdateParams,
+        NumpyColumnDeleteParams,
+    ]
+):
+    """
+    A table stored as one .npy file per column, memory-mapped on demand.
+    Reads hand filter_func a DataFrame of the requested columns, like
+    PandasCSVStorageBroker; creates append to the column files, while
+    updates and deletes rewrite the columns they change.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.mmap_mode = "r"
+        self._manifest = None
+        self._arrays = {}  # Column name -> values as stored, opened on first use
+        self._dictionaries = {}  # Column name -> its strings, as an object array
+        self._transaction = None  # Committed manifest and new files, while open
+
+    @instrumented
+    def connect(self, params: NumpyColumnConnectParams):
+        if params.mmap_mode not in MMAP_MODES:
+            raise ValueError(
+                f"Unknown mmap_mode '{params.mmap_mode}', expected one of {MMAP_MODES}"
+            )
+        self.close()
+        self.directory = params.directory
+        self.mmap_mode = params.mmap_mode
+        os.makedirs(self.directory, exist_ok=True)
+        self._manifest = column_files.read_manifest(self.directory) or {
+            "version": column_files.MANIFEST_VERSION,
+            "rows": 0,
+            "generation": 0,
+            "columns": [],
+        }
+        logger.info(
+            "Connected to column store at %s with %s rows",
+            self.directory,
+            self._manifest["rows"],
+        )
+
+    @instrumented
+    def create(self, params: NumpyColumnCreateParams):
+        if isinstance(params.data, pd.DataFrame):
+            new_df = params.data
+        else:
+            new_df = pd.DataFrame(params.data)
+        if not self._manifest["columns"]:
+            # The first rows define the table
+            self._write_table(new_df.reset_index(drop=True))
+            logger.debug("Created column store with %s rows.", len(new_df.index))
+            return len(new_df.index)
+        columns = self._column_names()
+        if set(new_df.columns) != set(columns):
+            raise ValueError(
+                f"Columns {list(new_df.columns)} do not match the existing "
+                f"columns {columns}"
+            )
+        rows = self._manifest["rows"]
+        if not all(
+            self._fits(entry, new_df[entry["name"]])
+            for entry in self._manifest["columns"]
+        ):
+            # A column's dtype has to widen, which takes rewriting the table
+            df = self._frame(columns, copy=True)
+            self._write_table(pd.concat([df, new_df[columns]], ignore_index=True))
+            logger.debug("Rewrote column store to append %s rows.", len(new_df.index))
+            return len(new_df.index)
+        for entry in self._manifest["columns"]:
+            self._append_column(entry, new_df[entry["name"]], rows)
+        self._manifest["rows"] = rows + len(new_df.index)
+        self._save_manifest(self._manifest)
+        self._arrays = {}
+        logger.debug("Appended %s rows to column store.", len(new_df.index))
+        return len(new_df.index)
+
+    @instrumented
+    def read(self, params: NumpyColumnReadParams):
+        columns = self._column_names() if params.columns is None else params.columns
+        data = self._frame(columns, copy=not params.read_only)
+        if params.filter_func:
+            result = params.filter_func(data)
+        else:
+            result = data
+        logger.debug("Read %s columns from column store.", len(columns))
+        return result
+
+    @instrumented
+    def update(self, params: NumpyColumnUpdateParams):
+        df = self._frame(self._column_names(), copy=True)
+        new_df = params.update_func(df.copy())
+        if len(new_df.index) == len(df.index) and list(new_df.columns) == list(
+            df.columns
+        ):
+            # Same shape: only the columns with new values are rewritten
+            changed = [
+                column for column in df.columns if not df[column].equals(new_df[column])
+            ]
+        else:
+            changed = list(new_df.columns)
+        if changed:
+            self._write_table(new_df.reset_index(drop=True), columns=changed)
+        logger.debug("Updated %s columns in column store.", len(changed))
+
+    @instrumented
+    def delete(self, params: NumpyColumnDeleteParams):
+        df = self._frame(self._column_names(), copy=True)
+        before = len(df.index)
+        new_df = params.delete_func(df.copy())
+        if len(new_df.index) != before:
+            self._write_table(new_df.reset_index(drop=True))
+        logger.debug("Deleted %s rows from column store.", before - len(new_df.index))
+        return before - len(new_df.index)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold back the manifest, the store's commit point, until the block
+        exits. If it raises, the files it wrote are removed and the store is
+        left as it was. Nested blocks join the outer transaction.
+        """
+        if self._transaction is not None:
+            yield self
+            return
+        self._transaction = {
+            "manifest": copy.deepcopy(self._manifest),
+            "files": set(),  # Written in the block, not yet committed
+        }
+        try:
+            yield self
+        except BaseException:
+            state, self._transaction = self._transaction, None
+            self._remove_files(state["files"])
+            self._manifest = state["manifest"]
+            self._arrays = {}
+            self._dictionaries = {}
+            raise
+        state, self._transaction = self._transaction, None
+        if self._manifest != state["manifest"]:
+            column_files.write_manifest(self.directory, self._manifest)
+            self._remove_files(
+                _file_names(state["manifest"]) - _file_names(self._manifest)
+            )
+        logger.debug("Committed transaction on column store %s.", self.directory)
+
+    def close(self):
+        # Drops the memory maps; frames already read keep theirs alive
+        self._arrays = {}
+        self._dictionaries = {}
+
+    def _column_names(self):
+        return [entry["name"] for entry in self._manifest["columns"]]
+
+    def _frame(self, columns, copy):
+        entries = {entry["name"]: entry for entry in self._manifest["columns"]}
+        unknown = [column for column in columns if column not in entries]
+        if unknown:
+            raise ValueError(f"Columns {unknown} are not in the column store.")
+        index = pd.RangeIndex(self._manifest["rows"])
+        arrays = {}
+        for position, column in enumerate(columns):
+            entry = entries[column]
+            values = self._values(entry)
+            if copy and entry["dtype"] != column_files.STRING:
+                values = np.array(values)
+            arrays[position] = pd.Series(values, index=index, copy=False)
+        df = pd.DataFrame(arrays, index=index, copy=False)
+        df.columns = list(columns)
+        return df
+
+    def _values(self, entry):
+        stored = self._array(entry)
+        if entry["dtype"] != column_files.STRING:
+            return stored
+        # Decoding builds a new object array, never a view of the file
+        dictionary = self._dictionary(entry)
+        if len(dictionary) == 0:
+            return np.full(len(stored), np.nan, dtype=object)
+        values = dictionary.take(stored, mode="clip")
+        values[stored < 0] = np.nan
+        return values
+
+    def _array(self, entry):
+        array = self._arrays.get(entry["name"])
+        if array is None:
+            array = column_files.open_array(
+                self._path(entry["file"]), self._manifest["rows"], self.mmap_mode
+            ).view()
+            # Shared by every read, so nothing may write into it
+            array.flags.writeable = False
+            self._arrays[entry["name"]] = array
+        return array
+
+    def _dictionary(self, entry):
+        dictionary = self._dictionaries.get(entry["name"])
+        if dictionary is None:
+            strings = column_files.read_dictionary(
+                self._path(entry["dictionary"]), entry["dictionary_bytes"]
+            )
+            dictionary = np.empty(len(strings), dtype=object)
+            dictionary[:] = strings
+            self._dictionaries[entry["name"]] = dictionary
+        return dictionary
+
+    @staticmethod
+    def _fits(entry, values):
+        if entry["dtype"] == column_files.STRING:
+            return True
+        dtype = np.dtype(entry["dtype"])
+        return np.result_type(dtype, _to_array(entry["name"], values).dtype) == dtype
+
+    def _append_column(self, entry, values, rows):
+        if entry["dtype"] == column_files.STRING:
+            codes, new_strings = _encode(entry["name"], values, self._dictionary(entry))
+            column_files.append_array(self._path(entry["file"]), codes, rows)
+            if new_strings:
+                entry["dictionary_bytes"] = column_files.append_dictionary(
+                    self._path(entry["dictionary"]),
+                    new_strings,
+                    entry["dictionary_bytes"],
+                )
+                self._dictionaries.pop(entry["name"])
+            return
+        array = _to_array(entry["name"], values).astype(np.dtype(entry["dtype"]))
+        column_files.append_array(self._path(entry["file"]), array, rows)
+
+    def _write_table(self, df, columns=None):
+        """
+        Write the columns of `df` in `columns` (all by default) to new files,
+        then commit them with the manifest and remove the files they replace.
+        """
+        manifest = dict(self._manifest)
+        manifest["generation"] += 1
+        generation = manifest["generation"]
+        old_entries = {entry["name"]: entry for entry in self._manifest["columns"]}
+        entries = []
+        written = []
+        try:
+            for position, column in enumerate(df.columns):
+                if columns is not None and column not in columns:
+                    entries.append(old_entries[column])
+                    continue
+                # New files, so memory maps of the old ones stay valid, and
+                # named by position to keep column names out of file names
+                entry = self._column_entry(
+                    column, df[column], f"c{position}.g{generation}"
+                )
+                written.extend(
+                    name for name in (entry["file"], entry.get("dictionary")) if name
+                )
+                entries.append(entry)
+            manifest["columns"] = entries
+            manifest["rows"] = len(df.index)
+            self._save_manifest(manifest)
+        except BaseException:
+            self._remove_files(written)
+            raise
+        replaced = _file_names(self._manifest) - _file_names(manifest)
+        if self._transaction is not None:
+            # The committed files stay until the transaction commits
+            self._transaction["files"].update(written)
+            replaced &= self._transaction["files"]
+            self._transaction["files"] -= replaced
+        self._remove_files(replaced)
+        self._manifest = manifest
+        self._arrays = {}
+        self._dictionaries = {}
+
+    def _column_entry(self, column, values, stem):
+        file_name = f"{stem}.npy"
+        if _is_strings(values):
+            codes, strings = _encode(column, values, np.empty(0, dtype=object))
+            dictionary_name = f"{stem}.dict"
+            column_files.write_array(self._path(file_name), codes)
+            size = column_files.append_dictionary(
+                self._path(dictionary_name), strings, 0
+            )
+            return {
+                "name": column,
+                "dtype": column_files.STRING,
+                "file": file_name,
+                "dictionary": dictionary_name,
+                "dictionary_bytes": size,
+            }
+        array = _to_array(column, values)
+        column_files.write_array(self._path(file_name), array)
+        return {"name": column, "dtype": array.dtype.str, "file": file_name}
+
+    def _save_manifest(self, manifest):
+        # Inside a transaction the manifest is written when it commits
+        if self._transaction is None:
+            column_files.write_manifest(self.directory, manifest)
+
+    def _remove_files(self, names):
+        for name in names:
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+
+def _file_names(manifest):
+    return {
+        name
+        for entry in manifest["columns"]
+        for name in (entry["file"], entry.get("dictionary"))
+        if name
+    }
+
+
+def _is_strings(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return True
+    return values.dtype == object and pd.api.types.infer_dtype(
+        values, skipna=True
+    ) in ("string", "empty")
+
+
+def _to_array(column, values):
+    array = values.to_numpy()
+    if array.dtype == object or array.dtype.kind not in "biufmM":
+        raise TypeError(
+            f"Column '{column}' holds {values.dtype} values; the column store "
+            f"holds numbers, booleans, datetimes and strings."
+        )
+    return array
+
+
+def _encode(column, values, dictionary):
+    """
+    Codes of `values` in `dictionary`, extended by the strings it doesn't
+    have yet, which are returned too.
+    """
+    if not _is_strings(values):
+        raise TypeError(f"Column '{column}' holds strings; got {values.dtype} values.")
+    values = values.to_numpy(dtype=object)
+    known = pd.Index(dictionary, dtype=object)
+    codes = known.get_indexer(values)
+    missing = pd.isna(values)
+    new_strings = pd.unique(values[(codes < 0) & ~missing]).tolist()
+    if new_strings:
+        extended = known.append(pd.Index(new_strings, dtype=object))
+        codes = extended.get_indexer(values)
+    codes[missing] = -1
+    return codes.astype(column_files.CODE_DTYPE), new_strings
@@ -0,0 +1,83 @@
+"""
+Binary sidecar snapshots of a parsed CSV.
+
+A snapshot is a pickle file holding two objects: a small metadata dict
+describing the CSV it was built from, followed by the parsed DataFrame.
+The metadata is read first so a stale snapshot is rejected without
+unpickling the frame. Snapshots are trusted local files; never point
+`snapshot_path` at data from an untrusted source.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+
+SNAPSHOT_VERSION = 1
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def default_snapshot_path(csv_path):
+    return f"{csv_path}.snapshot.pkl"
+
+
+def fingerprint(csv_path, with_hash=True):
+    stat = os.stat(csv_path)
+    return {
+        "size": stat.st_size,
+        "hash": _hash_file(csv_path) if with_hash else None,
+    }
+
+
+def load_snapshot(csv_path, snapshot_path, options, verify_hash=True):
+    """
+    Return the snapshotted DataFrame, or None if the snapshot is missing,
+    older than the CSV, built with different options or from other content.
+    """
+    try:
+        if os.stat(snapshot_path).st_mtime_ns < os.stat(csv_path).st_mtime_ns:
+            return None
+        with open(snapshot_path, "rb") as f:
+            meta = pickle.load(f)
+            if (
+                meta.get("version") != SNAPSHOT_VERSION
+                or meta.get("options") != options
+                or meta.get("size") != os.stat(csv_path).st_size
+            ):
+                return None
+            if verify_hash and meta.get("hash") != _hash_file(csv_path):
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return None
+
+
+def write_snapshot(df, csv_fingerprint, snapshot_path, options):
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "options": options,
+        "size": csv_fingerprint["size"],
+        "hash": csv_fingerprint["hash"],
+    }
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory,
+        prefix=f".{os.path.basename(snapshot_path)}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _hash_file(path):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,132 @@
+"""
+Compact dtypes for the pandas CSV broker's in-memory frame.
+
+`optimize_dtypes` shrinks a freshly parsed frame: integers are downcast,
+floats become float32 where that loses nothing, and low-cardinality string
+columns become categoricals. `common_dtype` keeps a column's dtype as new
+values arrive, widening it only as far as the values need, so the CSV text
+written back is the same as with read_csv's default dtypes.
+"""
+import numpy as np
+import pandas as pd
+
+
+def optimize_dtypes(df, category_threshold=0.5, skip=()):
+    """
+    Shrink the dtypes of `df` in place, leaving the columns in `skip` alone.
+    String columns with at most `category_threshold` distinct values per row
+    become categoricals.
+    """
+    rows = len(df.index)
+    for column in df.columns:
+        if column in skip:
+            continue
+        values = df[column]
+        kind = values.dtype.kind
+        if kind in "iu":
+            df[column] = pd.to_numeric(values, downcast="integer")
+        elif kind == "f":
+            if _fits_float32(values):
+                df[column] = values.astype(np.float32)
+        elif (
+            values.dtype == object
+            and rows > 0
+            and values.nunique() <= category_threshold * rows
+            and pd.api.types.infer_dtype(values, skipna=True) == "string"
+        ):
+            df[column] = values.astype("category")
+    return df
+
+
+def common_dtype(dtype, values):
+    """
+    The smallest dtype holding a column of `dtype` and `values` alike:
+    `dtype` itself if the values fit, a categorical with the new categories
+    appended, or a wider numeric type.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        new = pd.Index(values.dropna().unique()).difference(dtype.categories)
+        if len(new) == 0:
+            return dtype
+        return pd.CategoricalDtype(
+            dtype.categories.append(new.astype(dtype.categories.dtype, copy=False)),
+            ordered=dtype.ordered,
+        )
+    if values.dtype == dtype:
+        return dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "iuf" and values.dtype.kind in "iuf":
+        if values.dtype.kind in "iu":
+            values = pd.to_numeric(values, downcast="integer")
+        elif not _fits_float32(values):
+            return np.promote_types(dtype, np.float64)
+        else:
+            values = values.astype(np.float32)
+        return np.promote_types(dtype, values.dtype)
+    # Anything else: whatever pandas would make of the two concatenated
+    return pd.concat([pd.Series([], dtype=dtype), values.iloc[:0]]).dtype
+
+
+def conform(df, reference, explicit):
+    """
+    Cast the columns of `df` in place to match the `reference` dtypes, or
+    the `explicit` schema for columns the reference doesn't have. Returns
+    the reference columns that had to be widened, with their new dtypes.
+    """
+    widened = {}
+    for column in df.columns:
+        if column in reference:
+            target = common_dtype(reference[column], df[column])
+            if target != reference[column]:
+                widened[column] = target
+        elif column in explicit:
+            target = pd.api.types.pandas_dtype(explicit[column])
+        else:
+            continue
+        if df[column].dtype != target:
+            df[column] = df[column].astype(target)
+    return widened
+
+
+def memory_report(df):
+    """
+    Bytes used by each column of `df`, next to what read_csv's default
+    dtypes would use for the same values.
+    """
+    rows = []
+    for column in df.columns:
+        values = df[column]
+        used = values.memory_usage(index=False, deep=True)
+        default = _default_dtype(values.dtype)
+        if default != values.dtype:
+            default_used = values.astype(default).memory_usage(index=False, deep=True)
+        else:
+            default_used = used
+        rows.append((column, str(values.dtype), used, str(default), default_used))
+    report = pd.DataFrame(
+        rows, columns=["column", "dtype", "bytes", "default_dtype", "default_bytes"]
+    ).set_index("column")
+    report["saved_bytes"] = report["default_bytes"] - report["bytes"]
+    return report
+
+
+def _default_dtype(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype.categories.dtype
+    if isinstance(dtype, np.dtype):
+        if dtype.kind in "iu":
+            return np.dtype(np.int64)
+        if dtype.kind == "f":
+            return np.dtype(np.float64)
+    return dtype
+
+
+def _fits_float32(values):
+    array = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(over="ignore"):
+        narrowed = array.astype(np.float32)
+    # Every value has to survive the round trip exactly...
+    if not np.array_equal(narrowed.astype(np.float64), array, equal_nan=True):
+        return False
+    # ...and print as the same text when the CSV is written back
+    distinct = np.unique(array[~np.isnan(array)])
+    return all(str(np.float32(value)) == str(value) for value in distinct.tolist())
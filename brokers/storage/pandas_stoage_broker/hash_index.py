@@ -0,0 +1,75 @@
+class HashIndex:
+    """
+    Maps each value of a column to the labels of the frame rows holding it.
+    Unique indexes map a key straight to its label, others to a label list.
+    """
+
+    def __init__(self, column, unique=False):
+        self.column = column
+        self.unique = unique
+        self._labels = {}
+
+    def rebuild(self, df):
+        if len(df.columns) == 0:
+            # No schema yet, so nothing to index
+            self._labels = {}
+            return
+        if self.column not in df.columns:
+            raise KeyError(f"Index column '{self.column}' is not in the CSV.")
+        if self.unique:
+            keys = df[self.column].tolist()
+            self._labels = dict(zip(keys, df.index.tolist()))
+            if len(self._labels) != len(keys):
+                duplicated = df[self.column][df[self.column].duplicated()]
+                raise ValueError(
+                    f"Duplicate keys in unique column '{self.column}': "
+                    f"{duplicated.unique().tolist()[:10]}"
+                )
+        else:
+            self._labels = {
+                key: labels.tolist()
+                for key, labels in df.index.groupby(df[self.column]).items()
+            }
+
+    def check_new_keys(self, keys):
+        if not self.unique:
+            return
+        keys = list(keys)
+        existing = [key for key in keys if key in self._labels]
+        if existing or len(set(keys)) != len(keys):
+            raise ValueError(
+                f"Duplicate keys in unique column '{self.column}': "
+                f"{existing[:10] or keys[:10]}"
+            )
+
+    def add(self, keys, labels):
+        if self.unique:
+            self._labels.update(zip(keys, labels))
+            return
+        for key, label in zip(keys, labels):
+            self._labels.setdefault(key, []).append(label)
+
+    def remove(self, keys, labels):
+        if self.unique:
+            for key in keys:
+                self._labels.pop(key, None)
+            return
+        for key, label in zip(keys, labels):
+            key_labels = self._labels.get(key)
+            if key_labels is None:
+                continue
+            key_labels.remove(label)
+            if not key_labels:
+                del self._labels[key]
+
+    def lookup(self, keys):
+        labels = []
+        for key in keys:
+            found = self._labels.get(key)
+            if found is None:
+                continue
+            if self.unique:
+                labels.append(found)
+            else:
+                labels.extend(found)
+        return labels
@@ -1,6 +1,27 @@
+import functools
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Union
+
+import numpy as np
 import pandas as pd
 
+from brokers.storage.broker_metrics import instrumented
 from brokers.storage.i_storage_broker import IStorageBroker
+from brokers.storage.pandas_stoage_broker import (
+    csv_snapshot,
+    dtype_schema,
+    shared_frame,
+)
+from brokers.storage.pandas_stoage_broker.hash_index import HashIndex
+from brokers.storage.pandas_stoage_broker.predicate_compiler import compile_mask
 from models.storage.pandas_broker_models.pandas_csv_connect_params import (
     PandasCSVConnectParams,
 )
@@ -10,12 +31,44 @@ from models.storage.pandas_broker_models.pandas_csv_create_params import (
 from models.storage.pandas_broker_models.pandas_csv_read_params import (
     PandasCSVReadParams,
 )
+from models.storage.pandas_broker_models.pandas_csv_stream_read_params import (
+    PandasCSVStreamReadParams,
+)
 from models.storage.pandas_broker_models.pandas_csv_update_params import (
     PandasCSVUpdateParams,
 )
 from models.storage.pandas_broker_models.pandas_csv_delete_params import (
     PandasCSVDeleteParams,
 )
+from models.storage.pandas_broker_models.pandas_csv_key_read_params import (
+    PandasCSVKeyReadParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_query_read_params import (
+    PandasCSVQueryReadParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_key_update_params import (
+    PandasCSVKeyUpdateParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_key_delete_params import (
+    PandasCSVKeyDeleteParams,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bytes from the end of the CSV kept to tell an append from a rewrite
+_TAIL_SIZE = 64
+
+SHARED_MEMORY_MODES = ("publish", "attach")
+
+
+def _synchronized(method):
+    # The follow watcher thread changes the frame under the same lock
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class PandasCSVStorageBroker(
@@ -28,49 +81,1002 @@ class PandasCSVStorageBroker(
     ]
 ):
     def __init__(self):
-        self.df = None  # DataFrame to hold CSV data
+        self._df = None  # DataFrame to hold CSV data, None until loaded
+        self._appended = []  # Frames created since the last consolidation
+        self._header = None
+        self._next_label = 0  # Row labels only grow, so they stay sorted
+        self._indexes = {}  # Column name -> HashIndex
+        self.primary_key = None
+        self._version = 0  # Bumped by every write, invalidates cached queries
+        self._query_cache = OrderedDict()
+        self._query_cache_version = 0
+        self.query_cache_size = 128
         self.file_path = None
         self.delimiter = ","
+        self.lazy = False
+        self.write_behind = False
+        self.flush_every = None
+        self.flush_interval = None
+        self.snapshot = False
+        self.snapshot_path = None
+        self.snapshot_verify_hash = True
+        self.dtypes = {}
+        self.optimize_dtypes = False
+        self.category_threshold = 0.5
+        self._dirty = False  # The whole frame must be rewritten on flush
+        self._unflushed = []  # Created frames not yet appended to the CSV
+        self._pending_ops = 0
+        self._last_flush = time.monotonic()
+        self._rollback_state = None  # Set while a transaction is open
+        self._transaction_owner = None  # Thread ident of the open transaction
+        self._viewed_columns = set()  # Columns read-only reads handed out views of
+        self.follow = False
+        self.follow_interval = None
+        self._file_state = None  # Size, mtime, inode and tail of the CSV as loaded
+        self._lock = threading.RLock()
+        self._watcher_stop = None
+        self.shared_memory = None
+        self.shared_memory_mode = "publish"
+        self._publisher = None  # SharedFramePublisher in publish mode
+        self._shared_control = None  # Control segment in attach mode
+        self._shared_generation = 0  # Generation of the attached frame
+        self._published_version = None  # _version of the last published frame
+        self.publish_every = None
+        self.publish_interval = None
+        self._unpublished_writes = 0
+        self._last_publish = time.monotonic()
 
+    @property
+    def df(self):
+        if self._df is None:
+            self._load()
+        # Appended rows are only concatenated onto the frame when it is next
+        # needed, so a run of creates costs a single concat instead of one each.
+        if self._appended:
+            frames = self._appended
+            if len(self._df.index) > 0:
+                frames = [self._df, *frames]
+            self._df = pd.concat(frames)
+            self._appended = []
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self._appended = []
+
+    @property
+    def loaded(self):
+        """
+        Whether the CSV has been read into memory.
+        """
+        return self._df is not None
+
+    @instrumented
+    @_synchronized
     def connect(self, params: PandasCSVConnectParams):
+        if params.shared_memory_mode not in SHARED_MEMORY_MODES:
+            raise ValueError(
+                f"Unknown shared_memory_mode '{params.shared_memory_mode}', "
+                f"expected one of {SHARED_MEMORY_MODES}"
+            )
+        attach = params.shared_memory is not None and (
+            params.shared_memory_mode == "attach"
+        )
+        if attach and (params.follow or params.follow_interval is not None):
+            raise ValueError(
+                "Attached brokers follow the published frame; "
+                "follow the CSV in the publishing broker instead."
+            )
+        if self.file_path is not None:
+            self._stop_watcher()
+            self.flush()
+            self._release_shared()
         self.file_path = params.file_path
         self.delimiter = params.delimiter
+        self.lazy = params.lazy
+        self.write_behind = params.write_behind
+        self.flush_every = params.flush_every
+        self.flush_interval = params.flush_interval
+        self.snapshot = params.snapshot
+        self.snapshot_path = (
+            params.snapshot_path
+            or csv_snapshot.default_snapshot_path(self.file_path)
+        )
+        self.snapshot_verify_hash = params.snapshot_verify_hash
+        self.primary_key = params.primary_key
+        self.query_cache_size = params.query_cache_size
+        self.dtypes = dict(params.dtypes)
+        self.optimize_dtypes = params.optimize_dtypes
+        self.category_threshold = params.category_threshold
+        self.follow = params.follow or params.follow_interval is not None
+        self.follow_interval = params.follow_interval
+        self._file_state = None
+        self.shared_memory = params.shared_memory
+        self.shared_memory_mode = params.shared_memory_mode
+        self.publish_every = params.publish_every
+        self.publish_interval = params.publish_interval
+        if attach:
+            self._shared_control = shared_frame.open_control(self.shared_memory)
+        elif self.shared_memory is not None:
+            self._publisher = shared_frame.SharedFramePublisher(self.shared_memory)
+        self._indexes = {
+            column: HashIndex(column, unique=column == self.primary_key)
+            for column in dict.fromkeys(
+                ([self.primary_key] if self.primary_key else [])
+                + list(params.index_columns)
+            )
+        }
+        self._last_flush = time.monotonic()
+        self.df = None
+        self._header = None  # CSV columns, read on demand while unloaded
+        if self.lazy:
+            # The frame is loaded on first use; streaming reads never load it
+            logger.info(
+                "Connected lazily to CSV at %s with delimiter '%s'",
+                self.file_path,
+                self.delimiter,
+            )
+        else:
+            self._load()
+        if self.follow_interval is not None:
+            self._start_watcher()
+
+    def _load(self):
+        if self._shared_control is not None:
+            self._attach_shared()
+            return
         try:
-            self.df = pd.read_csv(self.file_path, delimiter=self.delimiter)
-            print(
-                f"Connected to CSV at {self.file_path} with delimiter '{self.delimiter}'"
+            self.df = self._load_csv()
+            logger.info(
+                "Connected to CSV at %s with delimiter '%s'",
+                self.file_path,
+                self.delimiter,
             )
         except FileNotFoundError:
             # If file does not exist, create an empty DataFrame
+            self._file_state = None
             self.df = pd.DataFrame()
-            print(f"File {self.file_path} not found. Created empty DataFrame.")
+            logger.info("File %s not found. Created empty DataFrame.", self.file_path)
+        except pd.errors.EmptyDataError:
+            self.df = pd.DataFrame()
+            logger.info("File %s is empty. Created empty DataFrame.", self.file_path)
+        self._reindex()
+        self._version += 1
+        # Rows created while unloaded are on disk unless still unflushed
+        for new_df in self._unflushed:
+            self._buffer_created(new_df)
+        self._publish_shared()
 
+    @instrumented
+    @_synchronized
     def create(self, params: PandasCSVCreateParams):
+        self._follow()
+        self._check_writable()
         if isinstance(params.data, pd.DataFrame):
             new_df = params.data
         else:
             new_df = pd.DataFrame(params.data)
-        self.df = pd.concat([self.df, new_df], ignore_index=True)
-        # Save back to CSV
-        self.df.to_csv(self.file_path, index=False, sep=self.delimiter)
-        print(f"Appended new data to CSV.")
+        new_df = self._conform_columns(new_df)
+        if self._indexes and self._df is None:
+            self._load()
+        for index in self._indexes.values():
+            if index.column in new_df.columns:
+                index.check_new_keys(new_df[index.column].tolist())
+        if self.write_behind:
+            self._unflushed.append(new_df)
+        else:
+            # Append only the new rows to the end of the CSV
+            self._append_to_csv(new_df)
+        if self._df is not None:
+            self._buffer_created(new_df)
+        logger.debug("Appended new data to CSV.")
+        self._mark_written()
+        return len(new_df.index)
 
-    def read(self, params: PandasCSVReadParams):
+    @instrumented
+    @_synchronized
+    def read(
+        self,
+        params: Union[
+            PandasCSVReadParams, PandasCSVKeyReadParams, PandasCSVQueryReadParams
+        ],
+    ):
+        self._follow()
+        self._attach_latest()
+        if isinstance(params, PandasCSVQueryReadParams):
+            return self._read_query(params)
+        if isinstance(params, PandasCSVKeyReadParams):
+            return self._read_keys(params)
+        if isinstance(params, PandasCSVStreamReadParams):
+            return self._read_chunks(params)
+        if params.read_only:
+            data = self._read_only_view(self.df)
+            self._viewed_columns.update(self.df.columns)
+        else:
+            data = self.df.copy()
         if params.filter_func:
-            result = params.filter_func(self.df.copy())
+            result = params.filter_func(data)
         else:
-            result = self.df.copy()
-        print(f"Read data from CSV.")
+            result = data
+        logger.debug("Read data from CSV.")
         return result
 
-    def update(self, params: PandasCSVUpdateParams):
-        self.df = params.update_func(self.df.copy())
-        # Save back to CSV
-        self.df.to_csv(self.file_path, index=False, sep=self.delimiter)
-        print(f"Updated CSV data.")
+    @instrumented
+    @_synchronized
+    def update(
+        self, params: Union[PandasCSVUpdateParams, PandasCSVKeyUpdateParams]
+    ):
+        self._follow()
+        self._check_writable()
+        if isinstance(params, PandasCSVKeyUpdateParams):
+            return self._update_keys(params)
+        df = self.df
+        new_df = params.update_func(df.copy())
+        # Keep the frame's compact dtypes through whatever update_func did
+        dtype_schema.conform(
+            new_df, df.dtypes if len(df.index) > 0 else {}, self.dtypes
+        )
+        self.df = new_df
+        self._reindex()
+        self._mark_rewrite()
+        logger.debug("Updated CSV data.")
+        self._mark_written()
 
-    def delete(self, params: PandasCSVDeleteParams):
+    @instrumented
+    @_synchronized
+    def delete(
+        self, params: Union[PandasCSVDeleteParams, PandasCSVKeyDeleteParams]
+    ):
+        self._follow()
+        self._check_writable()
+        if isinstance(params, PandasCSVKeyDeleteParams):
+            return self._delete_keys(params)
+        before = len(self.df.index)
         self.df = params.delete_func(self.df.copy())
-        # Save back to CSV
-        self.df.to_csv(self.file_path, index=False, sep=self.delimiter)
-        print(f"Deleted data from CSV.")
+        self._reindex()
+        self._mark_rewrite()
+        logger.debug("Deleted data from CSV.")
+        self._mark_written()
+        return before - len(self.df.index)
+
+    @_synchronized
+    def flush(self):
+        """
+        Write any changes held back in write-behind mode to the CSV, and
+        publish the frame if it is shared. Inside a transaction nothing is
+        written until it commits.
+        """
+        self._write_pending()
+        self._publish_shared()
+
+    def _write_pending(self):
+        if self._rollback_state is not None:
+            return
+        if self._dirty:
+            self._write_csv()
+        elif self._unflushed:
+            self._append_to_csv(pd.concat(self._unflushed, ignore_index=True))
+        else:
+            return
+        self._dirty = False
+        self._unflushed = []
+        self._pending_ops = 0
+        self._last_flush = time.monotonic()
+        logger.info("Flushed CSV data to %s.", self.file_path)
+
+    @_synchronized
+    def close(self):
+        self._stop_watcher()
+        self.flush()
+        self._release_shared()
+
+    def memory_usage(self):
+        """
+        Bytes held by each column of the frame, next to what read_csv's
+        default dtypes would take.
+        """
+        return dtype_schema.memory_report(self.df)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Apply the writes in the block to the in-memory frame only, then
+        persist them with a single append or rewrite when it exits. If the
+        block raises, the frame, its indexes and any changes pending from
+        before are restored and the CSV is left untouched. Nested blocks join
+        the outer transaction; other threads wait for it to end and then run
+        their own.
+        """
+        with self._lock:
+            if self._transaction_owner == threading.get_ident():
+                yield self
+                return
+            yield from self._run_transaction()
+        logger.debug("Committed transaction on %s.", self.file_path)
+
+    def _run_transaction(self):
+        state = {
+            "df": self.df,
+            "unflushed": list(self._unflushed),
+            "dirty": self._dirty,
+            "pending_ops": self._pending_ops,
+            "write_behind": self.write_behind,
+            "flush_every": self.flush_every,
+            "flush_interval": self.flush_interval,
+        }
+        # The write-behind buffers hold every change until the commit
+        self.write_behind = True
+        self.flush_every = None
+        self.flush_interval = None
+        self._rollback_state = state
+        self._transaction_owner = threading.get_ident()
+        try:
+            yield self
+            self._rollback_state = None
+            self._transaction_owner = None
+            self._restore_write_settings(state)
+            self._write_pending()
+            self._unpublished_writes += 1
+            self._maybe_publish()
+        except BaseException:
+            self._rollback_state = None
+            self._transaction_owner = None
+            self._rollback(state)
+            raise
+
+    def cache_key(self, params):
+        if isinstance(params, PandasCSVQueryReadParams):
+            columns = tuple(params.columns) if params.columns is not None else None
+            key = ("query", params.where, columns, params.limit)
+        elif isinstance(params, PandasCSVKeyReadParams):
+            keys = params.keys
+            if isinstance(keys, (list, tuple)):
+                keys = tuple(keys)
+            key = ("keys", params.column, keys)
+        elif (
+            isinstance(params, PandasCSVStreamReadParams)
+            or params.cache_key is None
+        ):
+            return None
+        else:
+            key = ("read", params.cache_key, params.read_only)
+        key = (self.file_path,) + key
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _follow(self):
+        """
+        Catch up with changes other processes made to the CSV: parse just the
+        appended bytes if it only grew, or reload it if it was rewritten.
+        """
+        if not self.follow or self._df is None:
+            return
+        if self._dirty or self._unflushed or self._rollback_state is not None:
+            # The frame holds changes the CSV doesn't have yet
+            return
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            if self._file_state is not None:
+                self._reload("was removed")
+            return
+        state = self._file_state
+        if state is None:
+            if stat.st_size > 0:
+                self._reload("was created")
+            return
+        if (stat.st_size, stat.st_mtime_ns, stat.st_ino) == (
+            state["size"],
+            state["mtime"],
+            state["ino"],
+        ):
+            return
+        if (
+            stat.st_ino != state["ino"]
+            or stat.st_size <= state["size"]
+            or self._read_range(state["size"] - len(state["tail"]), state["size"])
+            != state["tail"]
+        ):
+            self._reload("was rewritten")
+            return
+        self._read_appended(state["size"])
+
+    def _read_appended(self, start):
+        data = self._read_range(start, None)
+        # A writer may be halfway through a line; leave it for the next check
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        columns = self._columns()
+        if columns is None:
+            self._reload("has its first rows")
+            return
+        new_df = pd.read_csv(
+            io.BytesIO(data[:end]),
+            header=None,
+            names=list(columns),
+            delimiter=self.delimiter,
+            dtype=self.dtypes or None,
+        )
+        for index in self._indexes.values():
+            index.check_new_keys(new_df[index.column].tolist())
+        if len(new_df.index) > 0:
+            self._buffer_created(new_df)
+            self._version += 1
+        self._record_file_state(start + end)
+        self._unpublished_writes += 1
+        self._maybe_publish()
+        logger.debug(
+            "Read %s rows appended to %s.", len(new_df.index), self.file_path
+        )
+
+    def _reload(self, reason):
+        logger.info("CSV %s %s; reloading it.", self.file_path, reason)
+        self.df = None
+        self._header = None
+        self._load()
+
+    def _read_range(self, start, end):
+        with open(self.file_path, "rb") as f:
+            f.seek(max(start, 0))
+            return f.read() if end is None else f.read(end - max(start, 0))
+
+    def _record_file_state(self, size=None):
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            self._file_state = None
+            return
+        size = stat.st_size if size is None else size
+        self._file_state = {
+            "size": size,
+            "mtime": stat.st_mtime_ns,
+            "ino": stat.st_ino,
+            "tail": self._read_range(size - _TAIL_SIZE, size),
+        }
+
+    def _start_watcher(self):
+        self._watcher_stop = threading.Event()
+        threading.Thread(
+            target=_watch,
+            args=(weakref.ref(self), self._watcher_stop, self.follow_interval),
+            name=f"csv-follow-{self.file_path}",
+            daemon=True,
+        ).start()
+
+    def _stop_watcher(self):
+        # Not joined: the watcher may be waiting for the lock held here
+        if self._watcher_stop is not None:
+            self._watcher_stop.set()
+            self._watcher_stop = None
+
+    def _publish_shared(self):
+        # Inside a transaction the frame is published when it commits
+        if (
+            self._publisher is None
+            or self._df is None
+            or self._rollback_state is not None
+            or self._published_version == self._version
+        ):
+            return
+        generation = self._publisher.publish(self.df)
+        self._published_version = self._version
+        self._unpublished_writes = 0
+        self._last_publish = time.monotonic()
+        logger.debug(
+            "Published generation %s of %s as %s.",
+            generation,
+            self.file_path,
+            self.shared_memory,
+        )
+
+    def _maybe_publish(self):
+        # Each publish copies the whole frame, so writes are batched into one
+        if self._publisher is None:
+            return
+        if (
+            self.publish_every is not None
+            and self._unpublished_writes >= self.publish_every
+        ) or (
+            self.publish_interval is not None
+            and time.monotonic() - self._last_publish >= self.publish_interval
+        ):
+            self._publish_shared()
+
+    def _attach_shared(self):
+        df, self._shared_generation = shared_frame.attach(self._shared_control)
+        self.df = df
+        self._reindex()
+        self._version += 1
+        logger.info(
+            "Attached to generation %s of shared frame %s.",
+            self._shared_generation,
+            self.shared_memory,
+        )
+
+    def _attach_latest(self):
+        if self._shared_control is None or self._df is None:
+            return
+        generation, _ = shared_frame.read_generation(self._shared_control)
+        if generation != self._shared_generation:
+            self._attach_shared()
+
+    def _check_writable(self):
+        if self._shared_control is not None:
+            raise ValueError(
+                f"Broker attached to shared frame {self.shared_memory} is "
+                f"read-only; write through the broker publishing it."
+            )
+
+    def _release_shared(self):
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
+        if self._shared_control is not None:
+            self._shared_control.close()
+            self._shared_control = None
+        self._published_version = None
+        self._shared_generation = 0
+
+    def _restore_write_settings(self, state):
+        self.write_behind = state["write_behind"]
+        self.flush_every = state["flush_every"]
+        self.flush_interval = state["flush_interval"]
+
+    def _rollback(self, state):
+        self._restore_write_settings(state)
+        self.df = state["df"]
+        self._unflushed = state["unflushed"]
+        self._dirty = state["dirty"]
+        self._pending_ops = state["pending_ops"]
+        self._reindex()
+        self._version += 1
+        logger.info("Rolled back transaction on %s.", self.file_path)
+
+    def _read_query(self, params: PandasCSVQueryReadParams):
+        if self._query_cache_version != self._version:
+            self._query_cache.clear()
+            self._query_cache_version = self._version
+        key = (
+            params.where,
+            tuple(params.columns) if params.columns is not None else None,
+            params.limit,
+        )
+        try:
+            result = self._query_cache.get(key)
+        except TypeError:
+            # A predicate holding an unhashable value, e.g. a list
+            key = None
+            result = None
+        if result is not None:
+            self._query_cache.move_to_end(key)
+            logger.debug("Read data from CSV (cached query).")
+        else:
+            df = self.df
+            positions = np.flatnonzero(compile_mask(df, params.where))
+            if params.limit is not None:
+                positions = positions[: params.limit]
+            if params.columns is not None:
+                column_positions = df.columns.get_indexer(params.columns)
+                if (column_positions < 0).any():
+                    raise KeyError(f"Columns {params.columns} are not all in the CSV.")
+                result = df.iloc[positions, column_positions]
+            else:
+                result = df.iloc[positions]
+            if key is not None and self.query_cache_size > 0:
+                self._query_cache[key] = result
+                if len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+            logger.debug("Read data from CSV.")
+        # Cached frames are shared between callers, so never hand out a writable one
+        return self._read_only_view(result)
+
+    def _read_keys(self, params: PandasCSVKeyReadParams):
+        df = self.df
+        positions = self._key_positions(df, params.column, params.keys)
+        result = df.iloc[positions]
+        logger.debug("Read %s rows by key from CSV.", len(positions))
+        return result
+
+    def _update_keys(self, params: PandasCSVKeyUpdateParams):
+        if (params.update_func is None) == (params.values is None):
+            raise ValueError("Pass exactly one of update_func and values.")
+        df = self._own_df()
+        if params.values is not None:
+            positions, values = self._key_values(
+                df, params.column, params.keys, params.values
+            )
+            rows = df.iloc[positions]
+            updated = pd.DataFrame(values, index=rows.index)
+        else:
+            positions = self._key_positions(df, params.column, params.keys)
+            rows = df.iloc[positions]
+            updated = params.update_func(rows.copy())
+            if not updated.index.equals(rows.index):
+                raise ValueError(
+                    "update_func must return the rows it was given, "
+                    "with the same index."
+                )
+        unknown = set(updated.columns) - set(df.columns)
+        if unknown:
+            raise ValueError(f"Columns {sorted(unknown)} are not in the CSV.")
+        if self._unchanged(rows, updated):
+            # Nothing to write: a CSV can only be rewritten, never patched
+            logger.debug("Update by key matched %s rows, none changed.", len(positions))
+            return len(positions)
+        changed_indexes = [
+            index for index in self._indexes.values() if index.column in updated.columns
+        ]
+        labels = rows.index.tolist()
+        for index in changed_indexes:
+            index.remove(rows[index.column].tolist(), labels)
+        try:
+            for index in changed_indexes:
+                index.check_new_keys(updated[index.column].tolist())
+        except ValueError:
+            for index in changed_indexes:
+                index.add(rows[index.column].tolist(), labels)
+            raise
+        for index in changed_indexes:
+            index.add(updated[index.column].tolist(), labels)
+        for column in updated.columns:
+            self._assign_column(df, column, positions, updated[column])
+        self._mark_rewrite()
+        logger.debug("Updated %s rows by key in CSV data.", len(positions))
+        self._mark_written()
+        return len(positions)
+
+    def _delete_keys(self, params: PandasCSVKeyDeleteParams):
+        df = self.df
+        positions = self._key_positions(df, params.column, params.keys)
+        if len(positions) == 0:
+            return 0
+        rows = df.iloc[positions]
+        labels = rows.index.tolist()
+        for index in self._indexes.values():
+            index.remove(rows[index.column].tolist(), labels)
+        keep = np.ones(len(df.index), dtype=bool)
+        keep[positions] = False
+        self._df = df[keep]
+        self._mark_rewrite()
+        logger.debug("Deleted %s rows by key from CSV data.", len(positions))
+        self._mark_written()
+        return len(positions)
+
+    def _key_positions(self, df, column, keys):
+        labels = self._key_index(column).lookup(_key_list(keys))
+        # Labels are sorted, so a binary search finds their positions
+        return df.index.searchsorted(labels)
+
+    def _key_values(self, df, column, keys, values):
+        """
+        Positions of the rows holding `keys`, and `values` for those rows:
+        scalars as they are, and lists, which hold one value per key, with
+        each value repeated over its key's rows. Keys that match no rows are
+        dropped along with their values.
+        """
+        keys = _key_list(keys)
+        per_key = {
+            name: list(value)
+            for name, value in values.items()
+            if pd.api.types.is_list_like(value)
+        }
+        for name, value in per_key.items():
+            if len(value) != len(keys):
+                raise ValueError(
+                    f"Values for '{name}' have {len(value)} items for "
+                    f"{len(keys)} keys."
+                )
+        index = self._key_index(column)
+        labels = []
+        owners = []  # Position in `keys` of the key each label matched
+        for position, key in enumerate(keys):
+            found = index.lookup([key])
+            labels.extend(found)
+            owners.extend([position] * len(found))
+        row_values = {
+            name: [per_key[name][owner] for owner in owners]
+            if name in per_key
+            else value
+            for name, value in values.items()
+        }
+        return df.index.searchsorted(labels), row_values
+
+    def _key_index(self, column):
+        column = column or self.primary_key
+        if column not in self._indexes:
+            raise ValueError(
+                f"Column '{column}' has no index. Declare it as primary_key or "
+                f"in index_columns of PandasCSVConnectParams."
+            )
+        return self._indexes[column]
+
+    @staticmethod
+    def _unchanged(rows, updated):
+        for column in updated.columns:
+            old = rows[column].to_numpy(dtype=object)
+            new = updated[column].to_numpy(dtype=object)
+            missing = pd.isna(old)
+            if not (missing == pd.isna(new)).all():
+                return False
+            if not (old[~missing] == new[~missing]).all():
+                return False
+        return True
+
+    def _assign_column(self, df, column, positions, values):
+        # Widen the column first when the new values don't fit its dtype
+        dtype = dtype_schema.common_dtype(df[column].dtype, values)
+        if dtype != df[column].dtype:
+            df[column] = df[column].astype(dtype)
+        elif column in self._viewed_columns:
+            # Read-only results are snapshots, so they keep the old array
+            df[column] = df[column].copy()
+        self._viewed_columns.discard(column)
+        array = values.to_numpy()
+        if isinstance(dtype, np.dtype):
+            array = array.astype(dtype, copy=False)
+        df.iloc[positions, df.columns.get_loc(column)] = array
+
+    def _own_df(self):
+        # For writes in place: a transaction's rollback frame must stay as it was
+        df = self.df
+        if self._rollback_state is not None and df is self._rollback_state["df"]:
+            df = self._df = df.copy()
+        return df
+
+    def _buffer_created(self, new_df):
+        if len(self._df.index) > 0:
+            reference = self._df.dtypes
+        elif self._appended:
+            reference = self._appended[0].dtypes
+        else:
+            reference = {}
+        widened = dtype_schema.conform(new_df, reference, self.dtypes)
+        if widened:
+            df = self._own_df()
+            for column, dtype in widened.items():
+                df[column] = df[column].astype(dtype)
+        new_df.index = pd.RangeIndex(
+            self._next_label, self._next_label + len(new_df.index)
+        )
+        self._next_label += len(new_df.index)
+        for index in self._indexes.values():
+            if index.column in new_df.columns:
+                index.add(new_df[index.column].tolist(), new_df.index.tolist())
+        self._appended.append(new_df)
+
+    def _reindex(self):
+        # Key lookups rely on unique, sorted row labels
+        df = self._df
+        if not (df.index.is_unique and df.index.is_monotonic_increasing) or (
+            len(df.index) > 0 and not pd.api.types.is_integer_dtype(df.index)
+        ):
+            df = df.reset_index(drop=True)
+            self._df = df
+        self._next_label = int(df.index[-1]) + 1 if len(df.index) > 0 else 0
+        for index in self._indexes.values():
+            index.rebuild(df)
+
+    @staticmethod
+    def _read_only_view(df):
+        # A new frame over read-only views of each column's array: building it
+        # is O(columns), and any write into it raises instead of leaking back.
+        arrays = {}
+        for position, (_, column) in enumerate(df.items()):
+            if isinstance(column.dtype, np.dtype):
+                values = column.to_numpy().view()
+                values.flags.writeable = False
+            else:
+                # Extension arrays have no read-only flag to set
+                values = column.array.copy()
+            # Passing the dtype skips pandas' type inference over object columns
+            arrays[position] = pd.Series(
+                values, index=df.index, dtype=column.dtype, copy=False
+            )
+        view = pd.DataFrame(arrays, copy=False)
+        view.columns = df.columns
+        return view
+
+    def _read_chunks(self, params: PandasCSVStreamReadParams):
+        # Chunks come straight from disk, so it has to be up to date first
+        self.flush()
+        logger.debug("Streaming data from CSV in chunks of %s.", params.chunksize)
+        return self._iter_chunks(params)
+
+    def _iter_chunks(self, params: PandasCSVStreamReadParams):
+        try:
+            reader = pd.read_csv(
+                self.file_path,
+                delimiter=self.delimiter,
+                chunksize=params.chunksize,
+                usecols=params.usecols,
+                dtype=self.dtypes or None,
+            )
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return
+        with reader:
+            for chunk in reader:
+                if params.filter_func:
+                    chunk = params.filter_func(chunk)
+                if len(chunk.index) > 0:
+                    yield chunk
+
+    def _load_csv(self):
+        if not self.snapshot:
+            return self._parse_csv()
+        # The snapshot holds the frame with its final dtypes
+        options = {
+            "delimiter": self.delimiter,
+            "dtypes": {column: str(dtype) for column, dtype in self.dtypes.items()},
+            "optimize_dtypes": self.optimize_dtypes,
+            "category_threshold": self.category_threshold,
+        }
+        df = csv_snapshot.load_snapshot(
+            self.file_path,
+            self.snapshot_path,
+            options,
+            verify_hash=self.snapshot_verify_hash,
+        )
+        if df is not None:
+            logger.info("Loaded snapshot %s", self.snapshot_path)
+            if self.follow:
+                self._record_file_state()
+            return df
+        # Fingerprint before parsing, so a CSV changed mid-parse isn't
+        # recorded as matching the snapshot
+        fingerprint = csv_snapshot.fingerprint(self.file_path)
+        df = self._parse_csv()
+        csv_snapshot.write_snapshot(df, fingerprint, self.snapshot_path, options)
+        logger.info("Rebuilt snapshot %s", self.snapshot_path)
+        return df
+
+    def _parse_csv(self):
+        source = self.file_path
+        if self.follow:
+            # Parse exactly the bytes the file state records, so rows appended
+            # meanwhile are picked up by the next check rather than lost
+            with open(self.file_path, "rb") as f:
+                data = f.read()
+            self._record_file_state(len(data))
+            source = io.BytesIO(data)
+        df = pd.read_csv(source, delimiter=self.delimiter, dtype=self.dtypes or None)
+        if self.optimize_dtypes:
+            dtype_schema.optimize_dtypes(
+                df, self.category_threshold, skip=self.dtypes.keys()
+            )
+        return df
+
+    def _mark_rewrite(self):
+        if self.write_behind:
+            # The full rewrite on flush covers any unflushed appends as well
+            self._dirty = True
+            self._unflushed = []
+        else:
+            # Save back to CSV
+            self._write_csv()
+
+    def _mark_written(self):
+        self._version += 1
+        if self._rollback_state is None:
+            self._unpublished_writes += 1
+            self._maybe_publish()
+        if not self.write_behind:
+            return
+        self._pending_ops += 1
+        if self.flush_every is not None and self._pending_ops >= self.flush_every:
+            self._write_pending()
+        elif (
+            self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self._write_pending()
+
+    def _write_csv(self):
+        # Write to a temp file next to the CSV and rename it over the original,
+        # so a crash mid-write never leaves a truncated CSV behind.
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory,
+            prefix=f".{os.path.basename(self.file_path)}.",
+            suffix=".tmp",
+        )
+        try:
+            with os.fdopen(fd, "w", newline="") as f:
+                self.df.to_csv(f, index=False, sep=self.delimiter)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.file_path):
+                os.chmod(tmp_path, os.stat(self.file_path).st_mode)
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.follow:
+            self._record_file_state()
+
+    def _columns(self):
+        if self._df is None:
+            return self._unloaded_columns()
+        if len(self._df.columns) > 0:
+            return self._df.columns
+        if self._appended:
+            return self._appended[0].columns
+        return None
+
+    def _unloaded_columns(self):
+        # Lazy mode: check creates against the CSV header without loading it
+        if self._header is None:
+            try:
+                self._header = pd.read_csv(
+                    self.file_path, delimiter=self.delimiter, nrows=0
+                ).columns
+            except (FileNotFoundError, pd.errors.EmptyDataError):
+                pass
+        if self._header is not None and len(self._header) > 0:
+            return self._header
+        if self._unflushed:
+            return self._unflushed[0].columns
+        return None
+
+    def _conform_columns(self, new_df):
+        columns = self._columns()
+        if columns is None:
+            return new_df.copy()
+        if set(new_df.columns) != set(columns):
+            raise ValueError(
+                f"Columns {list(new_df.columns)} do not match the existing "
+                f"CSV columns {list(columns)}"
+            )
+        # Selecting also copies, so later changes by the caller don't leak in
+        return new_df[list(columns)]
+
+    def _append_to_csv(self, new_df):
+        write_header = (
+            not os.path.exists(self.file_path)
+            or os.path.getsize(self.file_path) == 0
+        )
+        if not write_header:
+            # Files written by other tools may not end with a newline
+            with open(self.file_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in (b"\n", b"\r")
+            if needs_newline:
+                # newline="" like pandas, or Windows would write "\r\r\n"
+                with open(self.file_path, "a", newline="") as f:
+                    f.write(os.linesep)
+        new_df.to_csv(
+            self.file_path,
+            mode="a",
+            header=write_header,
+            index=False,
+            sep=self.delimiter,
+        )
+        if self.follow:
+            self._record_file_state()
+
+
+def _key_list(keys):
+    if isinstance(keys, (list, tuple, set, frozenset, np.ndarray, pd.Index, pd.Series)):
+        return list(keys)
+    return [keys]
+
+
+def _watch(broker_ref, stop, interval):
+    # Holds the broker only weakly between checks, so it can still be freed
+    while not stop.wait(interval):
+        broker = broker_ref()
+        if broker is None:
+            return
+        try:
+            with broker._lock:
+                if stop.is_set():
+                    return
+                broker._follow()
+        except Exception:
+            logger.exception("Following %s failed.", broker.file_path)
+        del broker
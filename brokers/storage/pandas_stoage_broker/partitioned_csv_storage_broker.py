@@ -0,0 +1,435 @@
+import logging
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from itertools import chain
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from brokers.storage.broker_metrics import instrumented
+from brokers.storage.i_storage_broker import IStorageBroker
+from brokers.storage.pandas_stoage_broker.pandas_csv_storage_broker import (
+    PandasCSVStorageBroker,
+)
+from brokers.storage.pandas_stoage_broker.predicate_compiler import compile_mask
+from models.storage.pandas_broker_models.partitioned_csv_connect_params import (
+    PartitionedCSVConnectParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_connect_params import (
+    PandasCSVConnectParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_create_params import (
+    PandasCSVCreateParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_read_params import (
+    PandasCSVReadParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_stream_read_params import (
+    PandasCSVStreamReadParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_update_params import (
+    PandasCSVUpdateParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_delete_params import (
+    PandasCSVDeleteParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_key_read_params import (
+    PandasCSVKeyReadParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_query_read_params import (
+    PandasCSVQueryReadParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_key_update_params import (
+    PandasCSVKeyUpdateParams,
+)
+from models.storage.pandas_broker_models.pandas_csv_key_delete_params import (
+    PandasCSVKeyDeleteParams,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionedCSVStorageBroker(
+    IStorageBroker[
+        PartitionedCSVConnectParams,
+        PandasCSVCreateParams,
+        PandasCSVReadParams,
+        PandasCSVUpdateParams,
+        PandasCSVDeleteParams,
+    ]
+):
+    """
+    One table spread over several CSV files, each handled by a lazily
+    connected PandasCSVStorageBroker. Keyed requests only load the partitions
+    their keys fall in, full-table filters scan the files in a process pool,
+    and writes only touch the partitions they change.
+
+    Writes spanning several partitions are applied in a transaction on each
+    of them, so a failing write leaves every partition as it was.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.key_column = None
+        self.boundaries = None  # Range partitioning split points
+        self.delimiter = ","
+        self.workers = None
+        self.partitions = []  # One PandasCSVStorageBroker per file
+        self._pool = None
+
+    @instrumented
+    def connect(self, params: PartitionedCSVConnectParams):
+        if params.boundaries is not None:
+            boundaries = list(params.boundaries)
+            if boundaries != sorted(boundaries):
+                raise ValueError("boundaries must be sorted")
+            count = len(boundaries) + 1
+        elif params.partitions < 1:
+            raise ValueError("partitions must be at least 1")
+        else:
+            boundaries = None
+            count = params.partitions
+        self.close()
+        os.makedirs(params.directory, exist_ok=True)
+        self.directory = params.directory
+        self.key_column = params.key_column
+        self.boundaries = boundaries
+        self.delimiter = params.delimiter
+        self.workers = params.workers
+        if params.unique_keys:
+            primary_key, index_columns = params.key_column, params.index_columns
+        else:
+            primary_key = None
+            index_columns = [params.key_column, *params.index_columns]
+        self.partitions = []
+        for number in range(count):
+            partition = PandasCSVStorageBroker()
+            partition.connect(
+                PandasCSVConnectParams(
+                    file_path=self.partition_path(number),
+                    delimiter=params.delimiter,
+                    lazy=True,
+                    primary_key=primary_key,
+                    index_columns=list(index_columns),
+                )
+            )
+            self.partitions.append(partition)
+        logger.info(
+            "Connected to %s %s-partitioned CSVs in %s on '%s'",
+            count,
+            "range" if boundaries is not None else "hash",
+            self.directory,
+            self.key_column,
+        )
+
+    @instrumented
+    def create(self, params: PandasCSVCreateParams):
+        if isinstance(params.data, pd.DataFrame):
+            new_df = params.data
+        else:
+            new_df = pd.DataFrame(params.data)
+        if self.key_column not in new_df.columns:
+            raise ValueError(f"Rows must have the key column '{self.key_column}'.")
+        if new_df[self.key_column].isna().any():
+            raise ValueError(f"Key column '{self.key_column}' can't be null.")
+        numbers = self._partition_numbers(new_df[self.key_column])
+        created = 0
+        with ExitStack() as stack:
+            for number in np.unique(numbers):
+                partition = self.partitions[number]
+                stack.enter_context(partition.transaction())
+                created += partition.create(
+                    PandasCSVCreateParams(data=new_df[numbers == number])
+                )
+        logger.debug("Created %s rows in partitioned CSV.", created)
+        return created
+
+    @instrumented
+    def read(
+        self,
+        params: Union[
+            PandasCSVReadParams, PandasCSVKeyReadParams, PandasCSVQueryReadParams
+        ],
+    ):
+        if isinstance(params, PandasCSVKeyReadParams):
+            frames = [
+                self.partitions[number].read(
+                    PandasCSVKeyReadParams(keys=keys, column=params.column)
+                )
+                for number, keys, _ in self._keys_by_partition(params.column, params.keys)
+            ]
+            return _merge(frames)
+        if isinstance(params, PandasCSVStreamReadParams):
+            return chain.from_iterable(
+                partition.read(params) for partition in self.partitions
+            )
+        if isinstance(params, PandasCSVQueryReadParams):
+            result = self._scan(
+                _query_partition,
+                PandasCSVQueryReadParams(
+                    where=params.where, columns=params.columns, limit=params.limit
+                ),
+                (params.where, params.columns, params.limit),
+            )
+            if params.limit is not None:
+                result = result.iloc[: params.limit]
+            return result
+        return self._scan(
+            _filter_partition,
+            PandasCSVReadParams(filter_func=params.filter_func),
+            (params.filter_func,),
+        )
+
+    @instrumented
+    def update(
+        self, params: Union[PandasCSVUpdateParams, PandasCSVKeyUpdateParams]
+    ):
+        if isinstance(params, PandasCSVKeyUpdateParams):
+            if (params.update_func is None) == (params.values is None):
+                raise ValueError("Pass exactly one of update_func and values.")
+            updated = 0
+            with ExitStack() as stack:
+                for number, keys, values in self._keys_by_partition(
+                    params.column, params.keys, params.values
+                ):
+                    partition = self.partitions[number]
+                    stack.enter_context(partition.transaction())
+                    if values is not None:
+                        self._check_partition(
+                            number, pd.DataFrame(values, index=range(len(keys)))
+                        )
+                        update_func = None
+                    else:
+                        update_func = self._keep_in_partition(
+                            number, params.update_func
+                        )
+                    updated += partition.update(
+                        PandasCSVKeyUpdateParams(
+                            keys=keys,
+                            update_func=update_func,
+                            column=params.column,
+                            values=values,
+                        )
+                    )
+            return updated
+        rewritten = 0
+        with ExitStack() as stack:
+            for number, partition in enumerate(self.partitions):
+                df = partition.df
+                if len(df.columns) == 0:
+                    continue
+                new_df = params.update_func(df.copy())
+                if new_df.equals(df):
+                    continue
+                self._check_partition(number, new_df)
+                stack.enter_context(partition.transaction())
+                partition.update(
+                    PandasCSVUpdateParams(update_func=lambda _, new_df=new_df: new_df)
+                )
+                rewritten += 1
+        logger.debug("Updated %s of %s partitions.", rewritten, len(self.partitions))
+
+    @instrumented
+    def delete(
+        self, params: Union[PandasCSVDeleteParams, PandasCSVKeyDeleteParams]
+    ):
+        deleted = 0
+        with ExitStack() as stack:
+            if isinstance(params, PandasCSVKeyDeleteParams):
+                for number, keys, _ in self._keys_by_partition(params.column, params.keys):
+                    partition = self.partitions[number]
+                    stack.enter_context(partition.transaction())
+                    deleted += partition.delete(
+                        PandasCSVKeyDeleteParams(keys=keys, column=params.column)
+                    )
+                return deleted
+            for partition in self.partitions:
+                df = partition.df
+                if len(df.columns) == 0:
+                    continue
+                kept = params.delete_func(df.copy())
+                if kept.equals(df):
+                    continue
+                stack.enter_context(partition.transaction())
+                deleted += partition.delete(
+                    PandasCSVDeleteParams(delete_func=lambda _, kept=kept: kept)
+                )
+        logger.debug("Deleted %s rows from partitioned CSV.", deleted)
+        return deleted
+
+    @contextmanager
+    def transaction(self):
+        """
+        Open a transaction on every partition, so the block's writes are kept
+        in memory and each changed partition is written once when it exits.
+        """
+        with ExitStack() as stack:
+            for partition in self.partitions:
+                stack.enter_context(partition.transaction())
+            yield self
+
+    def partition_path(self, number):
+        return os.path.join(self.directory, f"part-{number:05d}.csv")
+
+    def flush(self):
+        for partition in self.partitions:
+            partition.flush()
+
+    def close(self):
+        for partition in self.partitions:
+            partition.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _partition_numbers(self, keys):
+        keys = pd.Series(keys)
+        if self.boundaries is not None:
+            return np.searchsorted(
+                np.asarray(self.boundaries), keys.to_numpy(), side="right"
+            )
+        # Hashing the keys as objects gives 5 and np.int64(5) the same
+        # partition, and unlike hash() it is stable across processes
+        hashes = pd.util.hash_array(keys.to_numpy(dtype=object))
+        return (hashes % len(self.partitions)).astype(np.intp)
+
+    def _keys_by_partition(self, column, keys, values=None):
+        """
+        (partition number, its keys, its values) for each partition holding
+        some of `keys`. List values, which hold one value per key, are split
+        along with the keys; scalar values go to every partition as they are.
+        """
+        if isinstance(keys, (list, tuple, set, frozenset, np.ndarray, pd.Index, pd.Series)):
+            keys = list(keys)
+        else:
+            keys = [keys]
+        per_key = {}
+        if values is not None:
+            per_key = {
+                name: list(value)
+                for name, value in values.items()
+                if pd.api.types.is_list_like(value)
+            }
+            for name, value in per_key.items():
+                if len(value) != len(keys):
+                    raise ValueError(
+                        f"Values for '{name}' have {len(value)} items for "
+                        f"{len(keys)} keys."
+                    )
+        if column not in (None, self.key_column):
+            # Only the key column says where a row lives; each partition skips
+            # the keys it doesn't hold, along with their values
+            return [(number, keys, values) for number in range(len(self.partitions))]
+        if not keys:
+            return []
+        numbers = self._partition_numbers(keys).tolist()
+        groups = {}
+        for position, number in enumerate(numbers):
+            groups.setdefault(number, []).append(position)
+        result = []
+        for number, positions in sorted(groups.items()):
+            partition_values = None
+            if values is not None:
+                partition_values = {
+                    name: [per_key[name][i] for i in positions]
+                    if name in per_key
+                    else value
+                    for name, value in values.items()
+                }
+            result.append((number, [keys[i] for i in positions], partition_values))
+        return result
+
+    def _check_partition(self, number, df):
+        if self.key_column not in df.columns or len(df.index) == 0:
+            return
+        if (self._partition_numbers(df[self.key_column]) != number).any():
+            raise ValueError(
+                f"Changing '{self.key_column}' would move rows to another "
+                "partition. Delete and re-create them instead."
+            )
+
+    def _keep_in_partition(self, number, update_func):
+        def checked(rows):
+            updated = update_func(rows)
+            self._check_partition(number, updated)
+            return updated
+
+        return checked
+
+    def _scan(self, scan, partition_params, scan_args):
+        workers = self.workers if self.workers is not None else os.cpu_count() or 1
+        # Loaded partitions are filtered where they are. The pool parses and
+        # filters the others, so only their matching rows cross processes.
+        cold = [
+            number
+            for number, partition in enumerate(self.partitions)
+            if not partition.loaded
+        ]
+        if workers < 2 or len(cold) < 2 or not _picklable(scan_args):
+            cold = []
+        futures = {}
+        if cold:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=workers)
+            futures = {
+                number: self._pool.submit(
+                    scan, self.partitions[number].file_path, self.delimiter, *scan_args
+                )
+                for number in cold
+            }
+        frames = {}
+        for number, partition in enumerate(self.partitions):
+            if number not in futures and len(partition.df.columns) > 0:
+                frames[number] = partition.read(partition_params)
+        for number, future in futures.items():
+            frames[number] = future.result()
+        return _merge([frames[number] for number in sorted(frames)])
+
+
+def _picklable(scan_args):
+    try:
+        pickle.dumps(scan_args)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        # e.g. a lambda filter_func, which is then applied in this process
+        return False
+    return True
+
+
+def _merge(frames):
+    frames = [frame for frame in frames if len(frame.columns) > 0]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def _read_partition(path, delimiter):
+    try:
+        return pd.read_csv(path, delimiter=delimiter)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame()
+
+
+def _filter_partition(path, delimiter, filter_func):
+    df = _read_partition(path, delimiter)
+    if filter_func is None or len(df.columns) == 0:
+        return df
+    return filter_func(df)
+
+
+def _query_partition(path, delimiter, where, columns, limit):
+    df = _read_partition(path, delimiter)
+    if len(df.columns) == 0:
+        return df
+    positions = np.flatnonzero(compile_mask(df, where))
+    if limit is not None:
+        positions = positions[:limit]
+    result = df.iloc[positions]
+    if columns is not None:
+        missing = set(columns) - set(df.columns)
+        if missing:
+            raise KeyError(f"Columns {sorted(missing)} are not in the CSV.")
+        result = result[list(columns)]
+    return result
@@ -0,0 +1,121 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+from models.storage.pandas_broker_models.pandas_csv_predicates import (
+    And,
+    Between,
+    Compare,
+    IsIn,
+    IsNull,
+    Not,
+    Or,
+)
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def compile_mask(df, predicate):
+    """
+    Evaluate a predicate over the whole frame as one boolean NumPy mask.
+    Missing values never match, except through IsNull.
+    """
+    if predicate is None:
+        return np.ones(len(df.index), dtype=bool)
+    if isinstance(predicate, Compare):
+        column = _column(df, predicate.column)
+        return _compare(column, _OPERATORS[predicate.op], predicate.value)
+    if isinstance(predicate, IsIn):
+        return _to_mask(_column(df, predicate.column).isin(predicate.values))
+    if isinstance(predicate, Between):
+        return _between(df, predicate)
+    if isinstance(predicate, IsNull):
+        return _to_mask(_column(df, predicate.column).isna())
+    if isinstance(predicate, And):
+        mask = np.ones(len(df.index), dtype=bool)
+        for part in predicate.predicates:
+            np.logical_and(mask, compile_mask(df, part), out=mask)
+        return mask
+    if isinstance(predicate, Or):
+        mask = np.zeros(len(df.index), dtype=bool)
+        for part in predicate.predicates:
+            np.logical_or(mask, compile_mask(df, part), out=mask)
+        return mask
+    if isinstance(predicate, Not):
+        # Negating a comparison with a missing value still doesn't match it
+        mask = ~compile_mask(df, predicate.predicate)
+        np.logical_and(mask, _known(df, predicate.predicate), out=mask)
+        return mask
+    raise TypeError(f"Unsupported predicate {type(predicate).__name__}")
+
+
+def _known(df, predicate):
+    """
+    Mask of the rows where `predicate` is true or false, rather than unknown
+    because a value it compares is missing, as in SQL.
+    """
+    if isinstance(predicate, (Compare, IsIn, Between)):
+        return _to_mask(_column(df, predicate.column).notna())
+    if predicate is None or isinstance(predicate, IsNull):
+        return np.ones(len(df.index), dtype=bool)
+    if isinstance(predicate, Not):
+        return _known(df, predicate.predicate)
+    # An And is also known where any part is known to be false, an Or where
+    # any part is known to be true
+    deciding = isinstance(predicate, Or)
+    known = np.ones(len(df.index), dtype=bool)
+    decided = np.zeros(len(df.index), dtype=bool)
+    for part in predicate.predicates:
+        part_known = _known(df, part)
+        np.logical_and(known, part_known, out=known)
+        np.logical_or(
+            decided, part_known & (compile_mask(df, part) == deciding), out=decided
+        )
+    return known | decided
+
+
+def _between(df, predicate):
+    if predicate.inclusive not in ("both", "left", "right", "neither"):
+        raise ValueError(f"Unknown inclusive '{predicate.inclusive}'")
+    column = _column(df, predicate.column)
+    mask = np.ones(len(df.index), dtype=bool)
+    if predicate.low is not None:
+        low_op = operator.ge if predicate.inclusive in ("both", "left") else operator.gt
+        np.logical_and(mask, _compare(column, low_op, predicate.low), out=mask)
+    if predicate.high is not None:
+        high_op = operator.le if predicate.inclusive in ("both", "right") else operator.lt
+        np.logical_and(mask, _compare(column, high_op, predicate.high), out=mask)
+    return mask
+
+
+def _compare(column, op, value):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Compare each category once and look the answers up by code. This
+        # also orders unordered categoricals by their values.
+        matches = _to_mask(op(pd.Series(column.cat.categories), value))
+        # Missing values have code -1, which picks the appended False
+        return np.append(matches, False)[column.cat.codes.to_numpy()]
+    mask = _to_mask(op(column, value))
+    if op is operator.ne:
+        # NaN != anything is True in NumPy, but missing values never match
+        np.logical_and(mask, _to_mask(column.notna()), out=mask)
+    return mask
+
+
+def _column(df, name):
+    if name not in df.columns:
+        raise KeyError(f"Column '{name}' is not in the CSV.")
+    return df[name]
+
+
+def _to_mask(result):
+    # Nullable dtypes give pd.NA for missing values; treat those as no match
+    return result.to_numpy(dtype=bool, na_value=False)
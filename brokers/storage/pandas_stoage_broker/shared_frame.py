@@ -0,0 +1,226 @@
+"""
+DataFrames shared between processes through multiprocessing.shared_memory.
+
+`SharedFramePublisher` copies a frame's column buffers into a new shared
+memory segment and points a small control segment, named after the frame,
+at it with a generation number that grows with every publish. `attach` maps
+the current segment into another process as a frame over read-only NumPy
+views, without parsing or copying the numeric and categorical columns.
+Other columns (object strings, extension types) are stored as codes into
+their distinct values, and rebuilt in each attaching process.
+
+Segment headers are pickled, so only attach to frames published by trusted
+processes on the same host.
+"""
+import mmap
+import os
+import pickle
+import struct
+import time
+from multiprocessing import shared_memory
+
+try:
+    import _posixshmem
+except ImportError:  # Not on Windows
+    _posixshmem = None
+
+import numpy as np
+import pandas as pd
+
+# Control segment: sequence number (odd while a publish is updating it),
+# generation, then the name of the data segment
+_CONTROL = struct.Struct("<QQ64s")
+_SEQUENCE = struct.Struct("<Q")
+_ALIGNMENT = 64
+_HEADER_LENGTH = struct.Struct("<Q")
+
+
+class SharedFramePublisher:
+    """
+    Publishes successive versions of a frame under `name`. Each publish
+    writes a new data segment and unlinks the previous one; processes still
+    attached to it keep their mapping until they let go of its frame.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.generation = 0
+        self._data = None
+        try:
+            self._control = shared_memory.SharedMemory(
+                name=name, create=True, size=_CONTROL.size
+            )
+        except FileExistsError:
+            # Left over from a publisher that exited without closing
+            self._control = shared_memory.SharedMemory(name=name)
+            self.generation = read_generation(self._control.buf)[0]
+
+    def publish(self, df):
+        generation = self.generation + 1
+        data = _write_frame(f"{self.name}-{generation}", df)
+        (sequence,) = _SEQUENCE.unpack_from(self._control.buf)
+        # A seqlock: readers retry while the sequence number is odd or changes
+        _SEQUENCE.pack_into(self._control.buf, 0, sequence + 1)
+        _CONTROL.pack_into(
+            self._control.buf, 0, sequence + 1, generation, data.name.encode()
+        )
+        _SEQUENCE.pack_into(self._control.buf, 0, sequence + 2)
+        self._release_data()
+        self._data = data
+        self.generation = generation
+        return generation
+
+    def close(self):
+        self._release_data()
+        if self._control is not None:
+            _release(self._control)
+            self._control = None
+
+    def _release_data(self):
+        if self._data is not None:
+            _release(self._data)
+            self._data = None
+
+
+def read_generation(control):
+    """
+    The generation and data segment name in the `control` buffer.
+    """
+    while True:
+        sequence, generation, data_name = _CONTROL.unpack_from(control)
+        if sequence % 2 == 0:
+            if _SEQUENCE.unpack_from(control)[0] == sequence:
+                return generation, data_name.rstrip(b"\0").decode()
+        time.sleep(0)
+
+
+def open_control(name):
+    """
+    Map the control segment of the frame published as `name`, read-only.
+    """
+    return _open(name)
+
+
+def attach(control):
+    """
+    The current frame published through `control`, and its generation.
+    """
+    while True:
+        generation, data_name = read_generation(control)
+        if generation == 0:
+            raise FileNotFoundError("No frame has been published yet")
+        try:
+            data = _open(data_name)
+        except FileNotFoundError:
+            # Replaced by a newer publish in the meantime
+            continue
+        return _read_frame(data), generation
+
+
+def _write_frame(name, df):
+    columns = []
+    buffers = []
+    # The index goes first, as a column without a label
+    for label, column in [(None, df.index), *df.items()]:
+        dtype = column.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns.append((label, "categorical", dtype))
+            buffers.append(np.asarray(column.array.codes))
+        elif isinstance(dtype, np.dtype) and dtype != object:
+            columns.append((label, "array", dtype))
+            buffers.append(np.ascontiguousarray(column.to_numpy()))
+        else:
+            values = column.to_numpy() if dtype == object else column.array
+            codes, uniques = pd.factorize(values, use_na_sentinel=True)
+            columns.append((label, "coded", (dtype, uniques)))
+            buffers.append(codes)
+    layout = []
+    offset = 0
+    for array in buffers:
+        layout.append((offset, array.dtype.str))
+        offset = _aligned(offset + array.nbytes)
+    header = pickle.dumps(
+        {
+            "rows": len(df.index),
+            "index_name": df.index.name,
+            "columns": [
+                (*column, position, dtype)
+                for column, (position, dtype) in zip(columns, layout)
+            ],
+        }
+    )
+    start = _aligned(_HEADER_LENGTH.size + len(header))
+    segment = shared_memory.SharedMemory(
+        name=name, create=True, size=max(start + offset, 1)
+    )
+    try:
+        _HEADER_LENGTH.pack_into(segment.buf, 0, len(header))
+        segment.buf[_HEADER_LENGTH.size:_HEADER_LENGTH.size + len(header)] = header
+        whole = np.frombuffer(segment.buf, dtype=np.uint8)
+        for array, (position, _) in zip(buffers, layout):
+            target = whole[start + position:start + position + array.nbytes]
+            target.view(array.dtype)[:] = array
+        del whole, target
+    except BaseException:
+        _release(segment)
+        raise
+    return segment
+
+
+def _read_frame(mapping):
+    # The frame's arrays keep the mapping alive until the last of them is gone
+    (length,) = _HEADER_LENGTH.unpack_from(mapping)
+    header = pickle.loads(mapping[_HEADER_LENGTH.size:_HEADER_LENGTH.size + length])
+    start = _aligned(_HEADER_LENGTH.size + length)
+    rows = header["rows"]
+    whole = np.frombuffer(mapping, dtype=np.uint8)
+    whole.flags.writeable = False
+    index = None
+    arrays = {}
+    for label, kind, dtype, position, stored in header["columns"]:
+        stored = np.dtype(stored)
+        values = whole[start + position:start + position + rows * stored.itemsize]
+        values = values.view(stored)
+        if kind == "categorical":
+            values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        elif kind == "coded":
+            dtype, uniques = dtype
+            values = pd.api.extensions.take(uniques, values, allow_fill=True)
+            values = pd.array(values, dtype=dtype, copy=False)
+        if index is None:
+            index = pd.Index(values, dtype=dtype, copy=False, name=header["index_name"])
+            continue
+        arrays[len(arrays)] = pd.Series(values, index=index, dtype=dtype, copy=False)
+    df = pd.DataFrame(arrays, index=index, copy=False)
+    df.columns = [column[0] for column in header["columns"][1:]]
+    return df
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _open(name):
+    if _posixshmem is None:
+        raise OSError("Attaching to shared frames needs POSIX shared memory")
+    # Mapped directly rather than through SharedMemory, which registers the
+    # segment with this process's resource tracker (before Python 3.13,
+    # unconditionally). The tracker would unlink the segment when this
+    # process exits, while the publisher and other readers still use it.
+    fd = _posixshmem.shm_open(f"/{name}", os.O_RDONLY, mode=0o600)
+    try:
+        return mmap.mmap(fd, os.fstat(fd).st_size, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+
+
+def _release(segment):
+    try:
+        segment.close()
+    except BufferError:
+        # This process still has frames over it; they keep it mapped
+        pass
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Union
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from brokers.storage.broker_metrics import instrumented
+from brokers.storage.i_async_storage_broker import IAsyncStorageBroker
+from brokers.storage.sqlalchemy_stoage_broker.sqlalchemy_broker_utils import (
+    engine_options,
+    row_batches,
+)
+from brokers.storage.sqlalchemy_stoage_broker.sqlite_pragmas import sqlite_pragmas
+from models.storage.sqlalchemy_broker_models.sqlalchemy_connect_params import (
+    SQLAlchemyConnectParams,
+)
+from models.storage.sqlalchemy_broker_models.sqlalchemy_create_params import (
+    SQLAlchemyCreateParams,
+)
+from models.storage.sqlalchemy_broker_models.sqlalchemy_bulk_create_params import (
+    SQLAlchemyBulkCreateParams,
+)
+from models.storage.sqlalchemy_broker_models.sqlalchemy_read_params import (
+    SQLAlchemyReadParams,
+)
+from models.storage.sqlalchemy_broker_models.sqlalchemy_stream_read_params import (
+    SQLAlchemyStreamReadParams,
+)
+from models.storage.sqlalchemy_broker_models.sqlalchemy_update_params import (
+    SQLAlchemyUpdateParams,
+)
+from models.storage.sqlalchemy_broker_models.sqlalchemy_delete_params import (
+    SQLAlchemyDeleteParams,
+)
+
+logger = logging.getLogger(__name__)
+
+# Broker -> (task, session) of the transaction open in the current context.
+# Tasks started inside the block inherit it, so the task is checked too.
+_transaction_sessions = ContextVar("transaction_sessions", default={})
+
+
+class AsyncSQLAlchemyStorageBroker(
+    IAsyncStorageBroker[
+        SQLAlchemyConnectParams,
+        SQLAlchemyCreateParams,
+        SQLAlchemyReadParams,
+        SQLAlchemyUpdateParams,
+        SQLAlchemyDeleteParams,
+    ]
+):
+    """
+    Broker on sqlalchemy.ext.asyncio. The database URL needs an async driver,
+    e.g. "sqlite+aiosqlite:///data.db" or "postgresql+asyncpg://...".
+
+    An AsyncSession can't be shared between concurrent tasks, so every
+    operation runs in its own session, or in the session of the task's open
+    `transaction()`, and `session_scope` is ignored.
+    Concurrent operations share the engine's connection pool.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.sqlite_pragmas = None
+        self.session_factory = (
+            async_sessionmaker(bind=engine) if engine is not None else None
+        )
+
+    @instrumented
+    async def connect(self, params: SQLAlchemyConnectParams):
+        try:
+            self.engine = create_async_engine(
+                params.database_url, **engine_options(params)
+            )
+            # Pool events are on the sync engine the async one wraps
+            self.sqlite_pragmas = sqlite_pragmas(self.engine.sync_engine, params)
+            self.session_factory = async_sessionmaker(bind=self.engine)
+            logger.info(
+                "Connected to %s with echo=%s",
+                params.database_url,
+                params.echo,
+            )
+        except SQLAlchemyError as e:
+            logger.error("Error connecting to database: %s", e)
+            raise
+
+    @instrumented
+    async def create(
+        self, params: Union[SQLAlchemyCreateParams, SQLAlchemyBulkCreateParams]
+    ):
+        if isinstance(params, SQLAlchemyBulkCreateParams):
+            return await self._bulk_create(params)
+        async with self._session() as session:
+            try:
+                result = await session.execute(params.statement)
+                await self._commit(session)
+                logger.debug("Executed create statement: %s", params.statement)
+                return result.rowcount
+            except SQLAlchemyError as e:
+                await self._rollback(session)
+                logger.error("Error executing create statement: %s", e)
+                raise
+
+    @instrumented
+    async def read(
+        self, params: Union[SQLAlchemyReadParams, SQLAlchemyStreamReadParams]
+    ):
+        if isinstance(params, SQLAlchemyStreamReadParams):
+            if params.batch_size < 1:
+                raise ValueError("batch_size must be at least 1")
+            logger.debug("Streaming read statement: %s", params.statement)
+            return self._iter_stream(params)
+        async with self._session() as session:
+            try:
+                result = await session.execute(params.statement)
+                records = result.fetchall()
+                logger.debug("Executed read statement: %s", params.statement)
+                return records
+            except SQLAlchemyError as e:
+                logger.error("Error executing read statement: %s", e)
+                raise
+
+    @instrumented
+    async def update(self, params: SQLAlchemyUpdateParams):
+        async with self._session() as session:
+            try:
+                result = await session.execute(params.statement)
+                await self._commit(session)
+                logger.debug("Executed update statement: %s", params.statement)
+                return result.rowcount
+            except SQLAlchemyError as e:
+                await self._rollback(session)
+                logger.error("Error executing update statement: %s", e)
+                raise
+
+    @instrumented
+    async def delete(self, params: SQLAlchemyDeleteParams):
+        async with self._session() as session:
+            try:
+                result = await session.execute(params.statement)
+                await self._commit(session)
+                logger.debug("Executed delete statement: %s", params.statement)
+                return result.rowcount
+            except SQLAlchemyError as e:
+                await self._rollback(session)
+                logger.error("Error executing delete statement: %s", e)
+                raise
+
+    async def close(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Run the operations in the block in one session and commit them once
+        when it exits, or roll them all back if it raises. Nested blocks join
+        the outer transaction. The transaction belongs to the task that opened
+        it; other tasks, including ones started inside the block, keep using
+        sessions of their own and commit on their own.
+        """
+        if self._transaction_session() is not None:
+            yield self
+            return
+        async with self.session_factory() as session:
+            token = _transaction_sessions.set(
+                {**_transaction_sessions.get(), self: (asyncio.current_task(), session)}
+            )
+            try:
+                yield self
+                await session.commit()
+            except BaseException:
+                await session.rollback()
+                raise
+            finally:
+                _transaction_sessions.reset(token)
+
+    @asynccontextmanager
+    async def bulk_load(self):
+        """
+        Relax durability (synchronous=OFF) on the broker's SQLite connections
+        while the block runs, and restore the profile when it exits, like
+        SQLAlchemyStorageBroker.bulk_load.
+        """
+        if self.sqlite_pragmas is None:
+            raise ValueError("bulk_load needs a SQLite database")
+        self.sqlite_pragmas.begin_bulk_load()
+        try:
+            yield self
+        finally:
+            self.sqlite_pragmas.end_bulk_load()
+            if self.sqlite_pragmas.pragmas.get("journal_mode", "").upper() == "WAL":
+                async with self.engine.connect() as connection:
+                    await connection.exec_driver_sql("PRAGMA wal_checkpoint(FULL)")
+
+    async def _commit(self, session):
+        # Inside a transaction the commit happens once, when it ends
+        if session is self._transaction_session():
+            return False
+        await session.commit()
+        return True
+
+    async def _rollback(self, session):
+        if session is not self._transaction_session():
+            await session.rollback()
+
+    def _transaction_session(self):
+        # Only the task that opened the transaction runs in its session; an
+        # AsyncSession can't serve concurrent tasks
+        task, session = _transaction_sessions.get().get(self, (None, None))
+        if session is None or task is not asyncio.current_task():
+            return None
+        return session
+
+    @asynccontextmanager
+    async def _session(self):
+        transaction_session = self._transaction_session()
+        if transaction_session is not None:
+            yield transaction_session
+        else:
+            async with self.session_factory() as session:
+                yield session
+
+    async def _iter_stream(self, params: SQLAlchemyStreamReadParams):
+        async with self._session() as session:
+            try:
+                result = await session.stream(
+                    params.statement,
+                    execution_options={"yield_per": params.batch_size},
+                )
+            except SQLAlchemyError as e:
+                logger.error("Error executing read statement: %s", e)
+                raise
+            try:
+                if params.as_dataframe:
+                    # pandas is only needed for this option
+                    import pandas as pd
+
+                    columns = list(result.keys())
+                    async for partition in result.partitions():
+                        yield pd.DataFrame.from_records(partition, columns=columns)
+                elif params.partitions:
+                    async for partition in result.partitions():
+                        yield partition
+                else:
+                    async for row in result:
+                        yield row
+            finally:
+                await result.close()
+
+    async def _bulk_create(self, params: SQLAlchemyBulkCreateParams):
+        if params.batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        statement = insert(params.table)
+        inserted = 0
+        committed = 0
+        async with self._session() as session:
+            try:
+                for batch in row_batches(params.rows, params.batch_size):
+                    await session.execute(statement, batch)
+                    inserted += len(batch)
+                    if not params.single_transaction and await self._commit(session):
+                        committed = inserted
+                await self._commit(session)
+                logger.info(
+                    "Bulk inserted %s rows into %s",
+                    inserted,
+                    params.table.name,
+                )
+                return inserted
+            except BaseException as e:
+                # Also when `rows` itself raises, so no batch is left pending
+                # for the session's next commit
+                await self._rollback(session)
+                logger.error(
+                    "Error bulk inserting into %s: %s. %s rows were committed "
+                    "before the error; the rest were rolled back.",
+                    params.table.name,
+                    e,
+                    committed,
+                )
+                raise
@@ -0,0 +1,69 @@
+from itertools import islice
+
+from sqlalchemy.sql.util import find_tables
+
+from models.storage.sqlalchemy_broker_models.sqlalchemy_connect_params import (
+    SQLAlchemyConnectParams,
+)
+
+
+def engine_options(params: SQLAlchemyConnectParams):
+    """
+    Keyword arguments for create_engine/create_async_engine, leaving out pool
+    settings that weren't set so each dialect's defaults still apply.
+    """
+    pool_options = {
+        "pool_size": params.pool_size,
+        "max_overflow": params.max_overflow,
+        "pool_recycle": params.pool_recycle,
+        "pool_timeout": params.pool_timeout,
+    }
+    return {
+        "echo": params.echo,
+        "pool_pre_ping": params.pool_pre_ping,
+        **{k: v for k, v in pool_options.items() if v is not None},
+    }
+
+
+def row_batches(rows, batch_size):
+    """
+    Split an iterable of row dicts, or a pandas DataFrame, into lists of at
+    most `batch_size` row dicts.
+    """
+    if hasattr(rows, "iloc") and hasattr(rows, "to_dict"):
+        # A pandas DataFrame: convert a slice at a time, with NaN as NULL
+        # and NumPy scalars as plain Python values the driver can bind
+        for start in range(0, len(rows.index), batch_size):
+            chunk = rows.iloc[start:start + batch_size].astype(object)
+            yield chunk.where(chunk.notna(), None).to_dict("records")
+        return
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def statement_tables(statement):
+    """
+    Names of the tables a statement reads or writes, or None when they can't
+    be told, e.g. for textual SQL.
+    """
+    names = frozenset(
+        table.name
+        for table in find_tables(statement, include_crud=True)
+        if getattr(table, "name", None)
+    )
+    return names or None
+
+
+def hashable(value):
+    """
+    `value` with lists, sets and dicts turned into tuples, so bind params
+    such as expanded IN lists can be part of a cache key.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(hashable(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, hashable(v)) for k, v in value.items()))
+    return value
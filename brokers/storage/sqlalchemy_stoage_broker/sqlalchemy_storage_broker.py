@@ -1,17 +1,36 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Union
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
+from brokers.storage.broker_metrics import instrumented
 from brokers.storage.i_storage_broker import IStorageBroker
+from brokers.storage.sqlalchemy_stoage_broker.sqlalchemy_broker_utils import (
+    engine_options,
+    hashable,
+    row_batches,
+    statement_tables,
+)
+from brokers.storage.sqlalchemy_stoage_broker.sqlite_pragmas import sqlite_pragmas
 from models.storage.sqlalchemy_broker_models.sqlalchemy_connect_params import (
     SQLAlchemyConnectParams,
 )
 from models.storage.sqlalchemy_broker_models.sqlalchemy_create_params import (
     SQLAlchemyCreateParams,
 )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_bulk_create_params import (
+    SQLAlchemyBulkCreateParams,
+)
 from models.storage.sqlalchemy_broker_models.sqlalchemy_read_params import (
     SQLAlchemyReadParams,
 )
+from models.storage.sqlalchemy_broker_models.sqlalchemy_stream_read_params import (
+    SQLAlchemyStreamReadParams,
+)
 from models.storage.sqlalchemy_broker_models.sqlalchemy_update_params import (
     SQLAlchemyUpdateParams,
 )
@@ -19,6 +38,10 @@ from models.storage.sqlalchemy_broker_models.sqlalchemy_delete_params import (
     SQLAlchemyDeleteParams,
 )
 
+logger = logging.getLogger(__name__)
+
+SESSION_SCOPES = ("shared", "thread", "operation")
+
 
 class SQLAlchemyStorageBroker(
     IStorageBroker[
@@ -32,53 +55,269 @@ class SQLAlchemyStorageBroker(
     def __init__(self, engine=None, session=None):
         self.engine = engine
         self.session = session
+        self.session_factory = None
+        self.session_scope = "shared"
+        self.sqlite_pragmas = None
+        self._local = threading.local()  # The calling thread's transaction
 
+    @instrumented
     def connect(self, params: SQLAlchemyConnectParams):
+        if params.session_scope not in SESSION_SCOPES:
+            raise ValueError(
+                f"Unknown session_scope '{params.session_scope}', "
+                f"expected one of {SESSION_SCOPES}"
+            )
         try:
-            self.engine = create_engine(params.database_url, echo=params.echo)
-            SessionLocal = sessionmaker(bind=self.engine)
-            self.session = SessionLocal()
-            print(f"Connected to {params.database_url} with echo={params.echo}")
+            self.engine = create_engine(
+                params.database_url, **engine_options(params)
+            )
+            self.sqlite_pragmas = sqlite_pragmas(self.engine, params)
+            self.session_factory = sessionmaker(bind=self.engine)
+            self.session_scope = params.session_scope
+            if self.session_scope == "thread":
+                # Proxies each call to a session owned by the calling thread
+                self.session = scoped_session(self.session_factory)
+            elif self.session_scope == "operation":
+                self.session = None
+            else:
+                self.session = self.session_factory()
+            logger.info(
+                "Connected to %s with echo=%s, session_scope=%s",
+                params.database_url,
+                params.echo,
+                self.session_scope,
+            )
         except SQLAlchemyError as e:
-            print(f"Error connecting to database: {e}")
+            logger.error("Error connecting to database: %s", e)
             raise
 
-    def create(self, params: SQLAlchemyCreateParams):
-        try:
-            self.session.execute(params.statement)
-            self.session.commit()
-            print(f"Executed create statement: {params.statement}")
-        except SQLAlchemyError as e:
-            self.session.rollback()
-            print(f"Error executing create statement: {e}")
-            raise
+    @instrumented
+    def create(
+        self, params: Union[SQLAlchemyCreateParams, SQLAlchemyBulkCreateParams]
+    ):
+        if isinstance(params, SQLAlchemyBulkCreateParams):
+            return self._bulk_create(params)
+        with self._session() as session:
+            try:
+                result = session.execute(params.statement)
+                self._commit(session)
+                logger.debug("Executed create statement: %s", params.statement)
+                return result.rowcount
+            except SQLAlchemyError as e:
+                self._rollback(session)
+                logger.error("Error executing create statement: %s", e)
+                raise
 
-    def read(self, params: SQLAlchemyReadParams):
-        try:
-            result = self.session.execute(params.statement)
-            records = result.fetchall()
-            print(f"Executed read statement: {params.statement}")
-            return records
-        except SQLAlchemyError as e:
-            print(f"Error executing read statement: {e}")
-            raise
+    @instrumented
+    def read(
+        self, params: Union[SQLAlchemyReadParams, SQLAlchemyStreamReadParams]
+    ):
+        if isinstance(params, SQLAlchemyStreamReadParams):
+            return self._read_stream(params)
+        with self._session() as session:
+            try:
+                result = session.execute(params.statement)
+                records = result.fetchall()
+                # Ends the implicit transaction, so the session gives its
+                # connection back to the pool between operations
+                self._commit(session)
+                logger.debug("Executed read statement: %s", params.statement)
+                return records
+            except SQLAlchemyError as e:
+                self._rollback(session)
+                logger.error("Error executing read statement: %s", e)
+                raise
 
+    @instrumented
     def update(self, params: SQLAlchemyUpdateParams):
-        try:
-            self.session.execute(params.statement)
-            self.session.commit()
-            print(f"Executed update statement: {params.statement}")
-        except SQLAlchemyError as e:
-            self.session.rollback()
-            print(f"Error executing update statement: {e}")
-            raise
+        with self._session() as session:
+            try:
+                result = session.execute(params.statement)
+                self._commit(session)
+                logger.debug("Executed update statement: %s", params.statement)
+                return result.rowcount
+            except SQLAlchemyError as e:
+                self._rollback(session)
+                logger.error("Error executing update statement: %s", e)
+                raise
 
+    @instrumented
     def delete(self, params: SQLAlchemyDeleteParams):
+        with self._session() as session:
+            try:
+                result = session.execute(params.statement)
+                self._commit(session)
+                logger.debug("Executed delete statement: %s", params.statement)
+                return result.rowcount
+            except SQLAlchemyError as e:
+                self._rollback(session)
+                logger.error("Error executing delete statement: %s", e)
+                raise
+
+    def close(self):
+        if isinstance(self.session, scoped_session):
+            self.session.remove()
+        elif self.session is not None:
+            self.session.close()
+        if self.engine is not None:
+            self.engine.dispose()
+
+    def cache_key(self, params):
+        # Streams hand out live cursors, which can't be replayed from a cache
+        if not isinstance(params, SQLAlchemyReadParams) or self.engine is None:
+            return None
+        # SQLAlchemy's own statement cache key, so nothing is compiled
+        statement_key = params.statement._generate_cache_key()
+        if statement_key is None:
+            return None
+        key = (
+            str(self.engine.url),
+            statement_key.key,
+            hashable([bind.effective_value for bind in statement_key.bindparams]),
+        )
         try:
-            self.session.execute(params.statement)
-            self.session.commit()
-            print(f"Executed delete statement: {params.statement}")
-        except SQLAlchemyError as e:
-            self.session.rollback()
-            print(f"Error executing delete statement: {e}")
-            raise
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def cache_tags(self, params):
+        if isinstance(params, SQLAlchemyBulkCreateParams):
+            return frozenset([params.table.name])
+        return statement_tables(params.statement)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run the operations in the block in one session and commit them once
+        when it exits, or roll them all back if it raises. Nested blocks join
+        the outer transaction.
+        """
+        if getattr(self._local, "session", None) is not None:
+            yield self
+            return
+        with self._session() as session:
+            self._local.session = session
+            try:
+                yield self
+                session.commit()
+            except BaseException:
+                session.rollback()
+                raise
+            finally:
+                self._local.session = None
+
+    @contextmanager
+    def bulk_load(self):
+        """
+        Relax durability (synchronous=OFF) on the broker's SQLite connections
+        while the block runs, e.g. around an import, and restore the profile
+        when it exits. A crash in the block can lose the rows it wrote.
+        Open transactions inside the block, not around it.
+        """
+        if self.sqlite_pragmas is None:
+            raise ValueError("bulk_load needs a SQLite database")
+        if getattr(self._local, "session", None) is not None:
+            raise ValueError("bulk_load can't start inside a transaction")
+        # Pragmas change as connections are checked out of the pool; sessions
+        # only hold one while an operation or transaction runs
+        self.sqlite_pragmas.begin_bulk_load()
+        try:
+            yield self
+        finally:
+            self.sqlite_pragmas.end_bulk_load()
+            if self.sqlite_pragmas.pragmas.get("journal_mode", "").upper() == "WAL":
+                # The WAL wasn't synced during the load; a checkpoint on a
+                # restored connection syncs it and copies it into the database
+                with self.engine.connect() as connection:
+                    connection.exec_driver_sql("PRAGMA wal_checkpoint(FULL)")
+
+    def _commit(self, session):
+        # Inside a transaction the commit happens once, when it ends
+        if getattr(self._local, "session", None) is not None:
+            return False
+        session.commit()
+        return True
+
+    def _rollback(self, session):
+        if getattr(self._local, "session", None) is None:
+            session.rollback()
+
+    @contextmanager
+    def _session(self):
+        transaction_session = getattr(self._local, "session", None)
+        if transaction_session is not None:
+            yield transaction_session
+        elif self.session_scope == "operation":
+            with self.session_factory() as session:
+                yield session
+        else:
+            yield self.session
+
+    def _read_stream(self, params: SQLAlchemyStreamReadParams):
+        if params.batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        logger.debug("Streaming read statement: %s", params.statement)
+        return self._iter_stream(params)
+
+    def _iter_stream(self, params: SQLAlchemyStreamReadParams):
+        with self._session() as session:
+            try:
+                # yield_per also turns on stream_results (a server-side cursor)
+                result = session.execute(
+                    params.statement,
+                    execution_options={"yield_per": params.batch_size},
+                )
+            except SQLAlchemyError as e:
+                self._rollback(session)
+                logger.error("Error executing read statement: %s", e)
+                raise
+            try:
+                with result:
+                    if params.as_dataframe:
+                        # pandas is only needed for this option
+                        import pandas as pd
+
+                        columns = list(result.keys())
+                        for partition in result.partitions():
+                            yield pd.DataFrame.from_records(partition, columns=columns)
+                    elif params.partitions:
+                        yield from result.partitions()
+                    else:
+                        yield from result
+            finally:
+                # Also when the caller stops early, so the connection is released
+                self._rollback(session)
+
+    def _bulk_create(self, params: SQLAlchemyBulkCreateParams):
+        if params.batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        statement = insert(params.table)
+        inserted = 0
+        committed = 0
+        with self._session() as session:
+            try:
+                for batch in row_batches(params.rows, params.batch_size):
+                    session.execute(statement, batch)
+                    inserted += len(batch)
+                    if not params.single_transaction and self._commit(session):
+                        committed = inserted
+                self._commit(session)
+                logger.info(
+                    "Bulk inserted %s rows into %s",
+                    inserted,
+                    params.table.name,
+                )
+                return inserted
+            except BaseException as e:
+                # Also when `rows` itself raises, so no batch is left pending
+                # for the session's next commit
+                self._rollback(session)
+                logger.error(
+                    "Error bulk inserting into %s: %s. %s rows were committed "
+                    "before the error; the rest were rolled back.",
+                    params.table.name,
+                    e,
+                    committed,
+                )
+                raise
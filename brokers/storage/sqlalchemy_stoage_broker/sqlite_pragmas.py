@@ -0,0 +1,126 @@
+"""
+SQLite pragmas applied to every pooled connection of an engine.
+
+A profile picks WAL journaling, so readers don't block on the writer, with
+the `synchronous`, `mmap_size`, `cache_size` and `temp_store` settings to
+go with it. While a bulk load runs, connections are switched to
+BULK_LOAD_PRAGMAS as they are checked out of the pool, and back when the
+last bulk load ends.
+"""
+import logging
+import re
+import threading
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PROFILES = {
+    # Commits survive power loss
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 256 * 2**20,
+        "cache_size": -64 * 2**10,  # Negative: KiB rather than pages
+        "temp_store": "MEMORY",
+    },
+    # Commits survive a crash of the process; with power loss the last ones
+    # may roll back, but the database stays consistent
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 2**20,
+        "cache_size": -64 * 2**10,
+        "temp_store": "MEMORY",
+    },
+}
+BULK_LOAD_PRAGMAS = {"synchronous": "OFF"}
+
+_WORD = re.compile(r"^\w+$")
+
+
+class SQLitePragmas:
+    """
+    Keeps the pragmas of an engine's connections in line with `pragmas`,
+    plus BULK_LOAD_PRAGMAS while any bulk load is running.
+    """
+
+    def __init__(self, engine, pragmas):
+        for name, value in pragmas.items():
+            if not _WORD.match(name) or not (
+                isinstance(value, int) or _WORD.match(str(value))
+            ):
+                raise ValueError(f"Invalid SQLite pragma {name}={value!r}")
+        self.pragmas = dict(pragmas)
+        self._bulk_loads = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+
+    def begin_bulk_load(self):
+        with self._lock:
+            self._bulk_loads += 1
+
+    def end_bulk_load(self):
+        with self._lock:
+            self._bulk_loads -= 1
+
+    def _wanted(self):
+        wanted = dict(self.pragmas)
+        if self._bulk_loads:
+            wanted.update(BULK_LOAD_PRAGMAS)
+        return wanted
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        connection_record.info["sqlite_pragmas"] = {}
+        connection_record.info["sqlite_defaults"] = {}
+        self._apply(dbapi_connection, connection_record.info)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self._apply(dbapi_connection, connection_record.info)
+
+    def _apply(self, dbapi_connection, info):
+        applied = info["sqlite_pragmas"]
+        defaults = info["sqlite_defaults"]
+        wanted = self._wanted()
+        # Pragmas only a finished bulk load set go back to what they were
+        for name in applied.keys() - wanted.keys():
+            wanted[name] = defaults[name]
+        changes = {
+            name: value for name, value in wanted.items() if applied.get(name) != value
+        }
+        if not changes:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in changes.items():
+                if name not in defaults:
+                    cursor.execute(f"PRAGMA {name}")
+                    defaults[name] = cursor.fetchone()[0]
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+        applied.update(changes)
+        logger.debug("Set SQLite pragmas %s", changes)
+
+
+def sqlite_pragmas(engine, params):
+    """
+    A SQLitePragmas for `engine` from the profile and pragmas in the connect
+    params, or None for other databases.
+    """
+    if params.sqlite_profile is not None and params.sqlite_profile not in SQLITE_PROFILES:
+        raise ValueError(
+            f"Unknown sqlite_profile '{params.sqlite_profile}', "
+            f"expected one of {tuple(SQLITE_PROFILES)}"
+        )
+    if engine.dialect.name != "sqlite":
+        if params.sqlite_profile is not None or params.sqlite_pragmas:
+            raise ValueError(
+                f"sqlite_profile and sqlite_pragmas only apply to SQLite, "
+                f"not {engine.dialect.name}"
+            )
+        return None
+    pragmas = dict(SQLITE_PROFILES.get(params.sqlite_profile, {}))
+    pragmas.update(params.sqlite_pragmas or {})
+    return SQLitePragmas(engine, pragmas)
@@ -1,3 +1,4 @@
+import logging
 from typing import get_type_hints
 
 from sqlalchemy import (
@@ -43,6 +44,11 @@ from models.storage.pandas_broker_models.pandas_csv_delete_params import (
 # Simple Service
 from services.storage.simple_storage_service import SimpleStorageService
 
+# Show the brokers' per-operation log messages
+broker_logger = logging.getLogger("brokers")
+broker_logger.addHandler(logging.StreamHandler())
+broker_logger.setLevel(logging.DEBUG)
+
 ##############
 # Sqlalchemy #
 ##############
@@ -159,6 +165,9 @@ broker.delete(delete_params)
 result = broker.read(PandasCSVReadParams())
 print(result)
 
+# Per-operation counts and latencies recorded by the broker
+print(broker.metrics.snapshot())
+
 # Instantiate the Pandas CSV Storage Broker
 pandas_csv_broker = PandasCSVStorageBroker()
 
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from models.storage.i_connect_params import IConnectParams
+
+
+@dataclass
+class NumpyColumnConnectParams(IConnectParams):
+    """
+    A table stored in `directory` as one .npy file per column plus a JSON
+    manifest. Columns are memory-mapped with `mmap_mode` ("r", or "c" for
+    copy-on-write); None reads them into memory instead.
+    """
+    directory: str
+    mmap_mode: Optional[str] = "r"
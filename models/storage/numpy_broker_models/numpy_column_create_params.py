@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Union, List, Dict
+
+from models.storage.i_create_params import ICreateParams
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class NumpyColumnCreateParams(ICreateParams):
+    data: Union["pd.DataFrame", List[Dict]]
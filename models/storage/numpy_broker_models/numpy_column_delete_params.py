@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+from models.storage.i_delete_params import IDeleteParams
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class NumpyColumnDeleteParams(IDeleteParams):
+    delete_func: Callable[["pd.DataFrame"], "pd.DataFrame"]
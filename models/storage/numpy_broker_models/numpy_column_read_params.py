@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from models.storage.i_read_params import IReadParams
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class NumpyColumnReadParams(IReadParams):
+    filter_func: Optional[Callable[["pd.DataFrame"], "pd.DataFrame"]] = None
+    # Only these columns are read from disk; all of them by default
+    columns: Optional[List[str]] = None
+    # Hand filter_func read-only views of the memory-mapped columns instead
+    # of a copy read into memory. Writing to them raises ValueError.
+    read_only: bool = False
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+from models.storage.i_update_params import IUpdateParams
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class NumpyColumnUpdateParams(IUpdateParams):
+    update_func: Callable[["pd.DataFrame"], "pd.DataFrame"]
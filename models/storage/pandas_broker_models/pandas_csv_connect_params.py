@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
 
 from models.storage.i_connect_params import IConnectParams
 
@@ -7,3 +8,52 @@ from models.storage.i_connect_params import IConnectParams
 class PandasCSVConnectParams(IConnectParams):
     file_path: str
     delimiter: str = ","
+    # Lazy: connect doesn't load the CSV; it is loaded on first use, and
+    # streaming reads never load it at all.
+    lazy: bool = False
+    # Write-behind: mutations only mark the broker dirty and the CSV is
+    # written on flush()/close(), every `flush_every` operations or once
+    # `flush_interval` seconds have passed since the last write.
+    write_behind: bool = False
+    flush_every: Optional[int] = None
+    flush_interval: Optional[float] = None
+    # Keep a pickled copy of the parsed frame next to the CSV and load it on
+    # connect while it still matches the CSV's size (and hash, if verified).
+    snapshot: bool = False
+    snapshot_path: Optional[str] = None
+    snapshot_verify_hash: bool = True
+    # Columns with hash indexes, used by the key-based read/update/delete
+    # params. Keys in `primary_key` must be unique, and it is the default
+    # column for key lookups.
+    primary_key: Optional[str] = None
+    index_columns: List[str] = field(default_factory=list)
+    # Maximum number of PandasCSVQueryReadParams results kept between writes
+    query_cache_size: int = 128
+    # Column dtypes to parse the CSV with, e.g. {"status": "category"}. With
+    # optimize_dtypes the other columns are shrunk after parsing: integers are
+    # downcast, floats become float32 where lossless, and string columns with
+    # at most `category_threshold` distinct values per row become
+    # categoricals. New rows are cast to the same dtypes.
+    dtypes: Dict[str, Any] = field(default_factory=dict)
+    optimize_dtypes: bool = False
+    category_threshold: float = 0.5
+    # Follow other processes writing the CSV: before each operation (and
+    # every `follow_interval` seconds on a watcher thread, if set) the file's
+    # size and mtime are checked. If it only grew, just the appended rows are
+    # parsed; if it was truncated or rewritten, it is reloaded. Changes
+    # pending in this broker take precedence until they are flushed.
+    follow: bool = False
+    follow_interval: Optional[float] = None
+    # Share the frame with other processes on this host: in "publish" mode
+    # the broker loads the CSV and publishes the frame in shared memory under
+    # this name. Every publish copies the whole frame, so writes are only
+    # republished on flush(), or by a write once `publish_every` writes (a
+    # transaction counts as one) or `publish_interval` seconds have
+    # accumulated since the last publish; attached readers see writes at that
+    # granularity. Brokers in "attach" mode map the published frame
+    # read-only instead of parsing the CSV, and pick up a newer generation on
+    # their next read.
+    shared_memory: Optional[str] = None
+    shared_memory_mode: str = "publish"
+    publish_every: Optional[int] = None
+    publish_interval: Optional[float] = None
@@ -1,11 +1,12 @@
 from dataclasses import dataclass
-from typing import Union, List, Dict
-
-import pandas as pd
+from typing import TYPE_CHECKING, Union, List, Dict
 
 from models.storage.i_create_params import ICreateParams
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 @dataclass
 class PandasCSVCreateParams(ICreateParams):
-    data: Union[pd.DataFrame, List[Dict]]
+    data: Union["pd.DataFrame", List[Dict]]
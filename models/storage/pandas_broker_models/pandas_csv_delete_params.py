@@ -1,11 +1,12 @@
 from dataclasses import dataclass
-from typing import Callable
-
-import pandas as pd
+from typing import TYPE_CHECKING, Callable
 
 from models.storage.i_delete_params import IDeleteParams
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 @dataclass
 class PandasCSVDeleteParams(IDeleteParams):
-    delete_func: Callable[[pd.DataFrame], pd.DataFrame]
+    delete_func: Callable[["pd.DataFrame"], "pd.DataFrame"]
@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from models.storage.i_delete_params import IDeleteParams
+
+
+@dataclass
+class PandasCSVKeyDeleteParams(IDeleteParams):
+    """
+    Delete the rows whose `column` (the primary key by default) holds `keys`.
+    """
+    keys: Any
+    column: Optional[str] = None
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from models.storage.i_read_params import IReadParams
+
+
+@dataclass
+class PandasCSVKeyReadParams(IReadParams):
+    """
+    Read the rows whose `column` (the primary key by default) holds `keys`,
+    a single key or a list of keys, through the column's hash index.
+    """
+    keys: Any
+    column: Optional[str] = None
@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from models.storage.i_update_params import IUpdateParams
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class PandasCSVKeyUpdateParams(IUpdateParams):
+    """
+    Update the rows whose `column` (the primary key by default) holds `keys`,
+    either by setting the columns in `values` to the given values, or with
+    `update_func`, which receives only those rows and must return them with
+    the same index. A scalar in `values` goes to every matched row; a list
+    holds one value per key, in the order of `keys`, for all of that key's
+    rows. Keys that match no rows are skipped along with their values.
+    """
+    keys: Any
+    update_func: Optional[Callable[["pd.DataFrame"], "pd.DataFrame"]] = None
+    column: Optional[str] = None
+    values: Optional[Dict[str, Any]] = None
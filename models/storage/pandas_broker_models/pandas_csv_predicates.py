@@ -0,0 +1,84 @@
+"""
+Declarative predicates for PandasCSVQueryReadParams.
+
+Predicates are frozen dataclasses, so they are hashable and a query can be
+used as a cache key. They combine with `&`, `|` and `~`:
+
+    (Compare("age", ">=", 18) & IsIn("country", ("NZ", "ZA"))) | ~IsNull("vip")
+"""
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+COMPARISON_OPS = ("==", "!=", "<", "<=", ">", ">=")
+
+
+@dataclass(frozen=True)
+class Predicate:
+
+    def __and__(self, other):
+        return And((self, other))
+
+    def __or__(self, other):
+        return Or((self, other))
+
+    def __invert__(self):
+        return Not(self)
+
+
+@dataclass(frozen=True)
+class Compare(Predicate):
+    column: str
+    op: str
+    value: Any
+
+    def __post_init__(self):
+        if self.op not in COMPARISON_OPS:
+            raise ValueError(
+                f"Unknown comparison '{self.op}', expected one of {COMPARISON_OPS}")
+
+
+@dataclass(frozen=True)
+class IsIn(Predicate):
+    column: str
+    values: Tuple[Any, ...]
+
+    def __post_init__(self):
+        # Keep the predicate hashable whatever iterable was passed in
+        object.__setattr__(self, "values", tuple(self.values))
+
+
+@dataclass(frozen=True)
+class Between(Predicate):
+    """
+    Range check; either bound may be None to leave that side open.
+    """
+    column: str
+    low: Optional[Any] = None
+    high: Optional[Any] = None
+    inclusive: str = "both"  # "both", "left", "right" or "neither"
+
+
+@dataclass(frozen=True)
+class IsNull(Predicate):
+    column: str
+
+
+@dataclass(frozen=True)
+class And(Predicate):
+    predicates: Tuple[Predicate, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, "predicates", tuple(self.predicates))
+
+
+@dataclass(frozen=True)
+class Or(Predicate):
+    predicates: Tuple[Predicate, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, "predicates", tuple(self.predicates))
+
+
+@dataclass(frozen=True)
+class Not(Predicate):
+    predicate: Predicate
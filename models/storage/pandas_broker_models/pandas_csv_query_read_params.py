@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from models.storage.i_read_params import IReadParams
+from models.storage.pandas_broker_models.pandas_csv_predicates import (
+    Predicate, )
+
+
+@dataclass
+class PandasCSVQueryReadParams(IReadParams):
+    """
+    Declarative read: rows matching `where`, projected onto `columns` and cut
+    to the first `limit` rows. Results are cached until the data changes and
+    are returned read-only.
+    """
+    where: Optional[Predicate] = None
+    columns: Optional[List[str]] = None
+    limit: Optional[int] = None
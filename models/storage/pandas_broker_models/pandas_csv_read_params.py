@@ -1,11 +1,19 @@
 from dataclasses import dataclass
-from typing import Optional, Callable
-
-import pandas as pd
+from typing import TYPE_CHECKING, Callable, Hashable, Optional
 
 from models.storage.i_read_params import IReadParams
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 @dataclass
 class PandasCSVReadParams(IReadParams):
-    filter_func: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+    filter_func: Optional[Callable[["pd.DataFrame"], "pd.DataFrame"]] = None
+    # Hand filter_func a read-only view of the data instead of a full copy.
+    # Writing to the view raises ValueError; later writes to the broker copy
+    # the columns they change first, so the view stays a snapshot.
+    read_only: bool = False
+    # Names the result of filter_func so CachingStorageService can reuse it.
+    # Reads without a cache_key are never cached.
+    cache_key: Optional[Hashable] = None
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from typing import Optional, List
+
+from models.storage.pandas_broker_models.pandas_csv_read_params import (
+    PandasCSVReadParams, )
+
+
+@dataclass
+class PandasCSVStreamReadParams(PandasCSVReadParams):
+    """
+    Read the CSV from disk as a generator of DataFrame chunks. `filter_func`
+    is applied to each chunk, and chunks it filters down to nothing are skipped.
+    """
+    chunksize: int = 100_000
+    usecols: Optional[List[str]] = None
@@ -1,11 +1,12 @@
 from dataclasses import dataclass
-from typing import Callable
-
-import pandas as pd
+from typing import TYPE_CHECKING, Callable
 
 from models.storage.i_update_params import IUpdateParams
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 @dataclass
 class PandasCSVUpdateParams(IUpdateParams):
-    update_func: Callable[[pd.DataFrame], pd.DataFrame]
+    update_func: Callable[["pd.DataFrame"], "pd.DataFrame"]
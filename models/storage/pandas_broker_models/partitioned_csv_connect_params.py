@@ -0,0 +1,26 @@
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from models.storage.i_connect_params import IConnectParams
+
+
+@dataclass
+class PartitionedCSVConnectParams(IConnectParams):
+    """
+    Rows are spread over CSV files in `directory` by their `key_column`.
+    Without `boundaries` they are hash-partitioned into `partitions` files.
+    With sorted `boundaries` they are range-partitioned instead: partition i
+    holds keys from boundaries[i - 1] up to, but excluding, boundaries[i].
+    """
+    directory: str
+    key_column: str
+    partitions: int = 8
+    boundaries: Optional[List[Any]] = None
+    delimiter: str = ","
+    # Keys in key_column must be unique across all partitions
+    unique_keys: bool = True
+    # Extra hash-indexed columns, as in PandasCSVConnectParams
+    index_columns: List[str] = field(default_factory=list)
+    # Processes scanning partitions for full-table filters. None uses one per
+    # CPU; 1 scans in this process.
+    workers: Optional[int] = None
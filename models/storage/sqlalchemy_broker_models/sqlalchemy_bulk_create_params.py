@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Union
+
+from models.storage.i_create_params import ICreateParams
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from sqlalchemy import Table
+
+
+@dataclass
+class SQLAlchemyBulkCreateParams(ICreateParams):
+    """
+    Insert many rows into `table`, executemany-style, `batch_size` rows per
+    statement. With `single_transaction` all batches commit together;
+    otherwise each batch is committed as soon as it is inserted.
+    """
+    table: "Table"
+    rows: Union[Iterable[Mapping[str, Any]], "pd.DataFrame"]
+    batch_size: int = 1000
+    single_transaction: bool = True
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Dict, Optional, Union
 
 from models.storage.i_connect_params import IConnectParams
 
@@ -7,3 +8,17 @@ from models.storage.i_connect_params import IConnectParams
 class SQLAlchemyConnectParams(IConnectParams):
 	database_url: str
 	echo: bool = False
+	# Connection pool settings, passed on to create_engine when set
+	pool_size: Optional[int] = None
+	max_overflow: Optional[int] = None
+	pool_recycle: Optional[int] = None
+	pool_timeout: Optional[float] = None
+	pool_pre_ping: bool = False
+	# "shared": one session for the broker, "thread": one session per thread,
+	# "operation": a new session for every operation. All share one engine.
+	session_scope: str = "shared"
+	# SQLite only: "fast" or "durable" sets WAL journaling and the synchronous,
+	# mmap_size, cache_size and temp_store pragmas on every pooled connection.
+	# sqlite_pragmas adds or overrides single pragmas, e.g. {"cache_size": -2000}
+	sqlite_profile: Optional[str] = None
+	sqlite_pragmas: Optional[Dict[str, Union[int, str]]] = None
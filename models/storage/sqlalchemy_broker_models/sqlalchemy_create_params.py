@@ -1,10 +1,12 @@
 from dataclasses import dataclass
-
-from sqlalchemy.sql import Executable
+from typing import TYPE_CHECKING
 
 from models.storage.i_create_params import ICreateParams
 
+if TYPE_CHECKING:
+    from sqlalchemy.sql import Executable
+
 
 @dataclass
 class SQLAlchemyCreateParams(ICreateParams):
-    statement: Executable
+    statement: "Executable"
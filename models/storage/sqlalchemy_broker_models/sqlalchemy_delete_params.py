@@ -1,10 +1,12 @@
 from dataclasses import dataclass
-
-from sqlalchemy.sql import Executable
+from typing import TYPE_CHECKING
 
 from models.storage.i_delete_params import IDeleteParams
 
+if TYPE_CHECKING:
+    from sqlalchemy.sql import Executable
+
 
 @dataclass
 class SQLAlchemyDeleteParams(IDeleteParams):
-    statement: Executable
+    statement: "Executable"
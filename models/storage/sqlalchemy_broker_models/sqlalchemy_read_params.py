@@ -1,10 +1,12 @@
 from dataclasses import dataclass
-
-from sqlalchemy.sql import Executable
+from typing import TYPE_CHECKING
 
 from models.storage.i_read_params import IReadParams
 
+if TYPE_CHECKING:
+    from sqlalchemy.sql import Executable
+
 
 @dataclass
 class SQLAlchemyReadParams(IReadParams):
-    statement: Executable
+    statement: "Executable"
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from models.storage.i_read_params import IReadParams
+
+if TYPE_CHECKING:
+    from sqlalchemy.sql import Executable
+
+
+@dataclass
+class SQLAlchemyStreamReadParams(IReadParams):
+    """
+    Stream the rows of `statement` from a server-side cursor, fetching
+    `batch_size` rows at a time. Yields single rows by default, lists of rows
+    with `partitions`, or pandas DataFrames with `as_dataframe`.
+    """
+    statement: "Executable"
+    batch_size: int = 1000
+    partitions: bool = False
+    as_dataframe: bool = False
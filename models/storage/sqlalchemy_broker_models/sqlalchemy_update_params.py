@@ -1,10 +1,12 @@
 from dataclasses import dataclass
-
-from sqlalchemy.sql import Executable
+from typing import TYPE_CHECKING
 
 from models.storage.i_update_params import IUpdateParams
 
+if TYPE_CHECKING:
+    from sqlalchemy.sql import Executable
+
 
 @dataclass
 class SQLAlchemyUpdateParams(IUpdateParams):
-    statement: Executable
+    statement: "Executable"
@@ -0,0 +1,231 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Optional, TypeVar
+
+# Models
+from models.storage.i_connect_params import IConnectParams
+from models.storage.i_create_params import ICreateParams
+from models.storage.i_read_params import IReadParams
+from models.storage.i_update_params import IUpdateParams
+from models.storage.i_delete_params import IDeleteParams
+
+# Broker
+from brokers.storage.i_storage_broker import IStorageBroker
+
+# Service
+from services.storage.i_storage_service import IStorageService
+
+# Define type variables bound to their expected classes
+TConnectParams = TypeVar('TConnectParams', bound=IConnectParams)
+TCreateParams = TypeVar('TCreateParams', bound=ICreateParams)
+TReadParams = TypeVar('TReadParams', bound=IReadParams)
+TUpdateParams = TypeVar('TUpdateParams', bound=IUpdateParams)
+TDeleteParams = TypeVar('TDeleteParams', bound=IDeleteParams)
+
+TStorageBroker = TypeVar('TStorageBroker', bound=IStorageBroker)
+
+
+@dataclass
+class CacheEntry:
+  value: Any
+  tags: Optional[frozenset]  # None: depends on everything
+  size: int  # Estimated bytes
+  expires: Optional[float]  # time.monotonic() deadline
+
+
+@dataclass
+class CachingStorageService(IStorageService[
+    TStorageBroker,
+    TConnectParams,
+    TCreateParams,
+    TReadParams,
+    TUpdateParams,
+    TDeleteParams,
+]):
+  """
+    Read-through cache in front of a storage broker.
+
+    Reads are cached under `storage_broker.cache_key(params)`; reads without a
+    key go straight to the broker. The cache holds at most `max_entries`
+    results and `max_bytes` estimated bytes, evicting the least recently used
+    first, and drops results older than `ttl` seconds. Writes through the
+    service invalidate the entries sharing a tag from
+    `storage_broker.cache_tags(params)`. Writes made to the broker directly
+    aren't seen, so `ttl` bounds how stale those results can get.
+
+    Cached results are shared between callers and must not be modified.
+    """
+  storage_broker: TStorageBroker
+  max_entries: int = 1024
+  max_bytes: Optional[int] = 256 * 1024 * 1024
+  ttl: Optional[float] = None
+
+  _entries: OrderedDict = field(init=False,
+                                default_factory=OrderedDict,
+                                repr=False,
+                                compare=False)
+  _lock: Any = field(init=False,
+                     default_factory=threading.RLock,
+                     repr=False,
+                     compare=False)
+  # Tags written by the calling thread's open transaction
+  _local: Any = field(init=False,
+                      default_factory=threading.local,
+                      repr=False,
+                      compare=False)
+  _bytes: int = field(init=False, default=0, repr=False, compare=False)
+  # Bumped by every write, so a read racing a write doesn't cache its result
+  _generation: int = field(init=False, default=0, repr=False, compare=False)
+  _hits: int = field(init=False, default=0, repr=False, compare=False)
+  _misses: int = field(init=False, default=0, repr=False, compare=False)
+  _evictions: int = field(init=False, default=0, repr=False, compare=False)
+  _expirations: int = field(init=False, default=0, repr=False, compare=False)
+  _invalidations: int = field(init=False, default=0, repr=False, compare=False)
+
+  def __post_init__(self):
+    if self.max_entries < 1:
+      raise ValueError("max_entries must be at least 1")
+    super().__post_init__()
+
+  @property
+  def cache_info(self):
+    """
+      Counters and current size of the cache.
+      """
+    with self._lock:
+      return {
+          "hits": self._hits,
+          "misses": self._misses,
+          "evictions": self._evictions,
+          "expirations": self._expirations,
+          "invalidations": self._invalidations,
+          "entries": len(self._entries),
+          "bytes": self._bytes,
+      }
+
+  def clear_cache(self):
+    with self._lock:
+      self._generation += 1
+      self._invalidations += len(self._entries)
+      self._entries.clear()
+      self._bytes = 0
+
+  @contextmanager
+  def transaction(self):
+    if getattr(self._local, "tags", None) is not None:
+      with self.storage_broker.transaction():
+        yield self
+      return
+    self._local.tags = []
+    try:
+      with self.storage_broker.transaction():
+        yield self
+    except BaseException:
+      # Reads inside the block may have cached rolled-back writes
+      self.clear_cache()
+      raise
+    else:
+      # Other sessions may have cached the rows as they were before the
+      # commit, after the writes invalidated them
+      tags = self._local.tags
+      self._invalidate(None if None in tags else frozenset().union(*tags))
+    finally:
+      self._local.tags = None
+
+  def connect(self, params: TConnectParams):
+    try:
+      return self.storage_broker.connect(params=params)
+    finally:
+      self.clear_cache()
+
+  def create(self, params: TCreateParams):
+    try:
+      return self.storage_broker.create(params=params)
+    finally:
+      self._invalidate(self.storage_broker.cache_tags(params))
+
+  def read(self, params: TReadParams):
+    storage_broker = self.storage_broker
+    key = storage_broker.cache_key(params)
+    if key is None:
+      return storage_broker.read(params=params)
+
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None:
+        if entry.expires is None or entry.expires > time.monotonic():
+          self._entries.move_to_end(key)
+          self._hits += 1
+          return entry.value
+        self._drop(key)
+        self._expirations += 1
+      self._misses += 1
+      generation = self._generation
+
+    value = storage_broker.read(params=params)
+    tags = storage_broker.cache_tags(params)
+    with self._lock:
+      if generation == self._generation:
+        self._store(key, value, tags)
+    return value
+
+  def update(self, params: TUpdateParams):
+    try:
+      return self.storage_broker.update(params=params)
+    finally:
+      self._invalidate(self.storage_broker.cache_tags(params))
+
+  def delete(self, params: TDeleteParams):
+    try:
+      return self.storage_broker.delete(params=params)
+    finally:
+      self._invalidate(self.storage_broker.cache_tags(params))
+
+  def _store(self, key, value, tags):
+    size = _estimate_size(value)
+    if self.max_bytes is not None and size > self.max_bytes:
+      return
+    if key in self._entries:
+      self._drop(key)
+    expires = None if self.ttl is None else time.monotonic() + self.ttl
+    self._entries[key] = CacheEntry(value, tags, size, expires)
+    self._bytes += size
+    while len(self._entries) > self.max_entries or (
+        self.max_bytes is not None and self._bytes > self.max_bytes):
+      self._drop(next(iter(self._entries)))
+      self._evictions += 1
+
+  def _drop(self, key):
+    self._bytes -= self._entries.pop(key).size
+
+  def _invalidate(self, tags):
+    written = getattr(self._local, "tags", None)
+    if written is not None:
+      written.append(tags)
+    with self._lock:
+      self._generation += 1
+      if tags is None:
+        stale = list(self._entries)
+      else:
+        stale = [
+            key for key, entry in self._entries.items()
+            if entry.tags is None or entry.tags & tags
+        ]
+      for key in stale:
+        self._drop(key)
+      self._invalidations += len(stale)
+
+
+def _estimate_size(value):
+  # pandas objects report their own footprint; deep counts object columns
+  memory_usage = getattr(value, "memory_usage", None)
+  if callable(memory_usage):
+    usage = memory_usage(deep=True)
+    return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+  if isinstance(value, (list, tuple)):
+    return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+  return sys.getsizeof(value)
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+# Broker
+from brokers.storage.i_storage_broker import IStorageBroker
+
+# Service
+from services.storage.simple_storage_service import SimpleStorageService
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # Tells a writer there are no more chunks
+
+
+@dataclass
+class CopyProgress:
+  chunks: int  # Chunks written, including those skipped on resume
+  rows: int
+  elapsed: float  # Seconds since this run started
+
+  @property
+  def rows_per_second(self):
+    return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class CopyPipeline:
+  """
+    Streams chunks from one broker to another in bounded memory.
+
+    `source_broker.read(read_params)` must return an iterable of chunks, e.g.
+    DataFrames from PandasCSVStreamReadParams or
+    SQLAlchemyStreamReadParams(as_dataframe=True); their chunksize or
+    batch_size is the chunk size. Each chunk goes through `transform`, if
+    set, and `create_params` turns it into the params for
+    `target_broker.create`, e.g.
+    `lambda df: SQLAlchemyBulkCreateParams(table=table, rows=df)`.
+
+    The source is read on the calling thread while `writers` threads
+    transform and write the chunks. At most `max_pending` chunks (two per
+    writer by default) wait between them, so memory stays bounded however
+    many rows are copied. With more than one writer chunks may be written out
+    of order, and the target must be safe to call from several threads,
+    e.g. a SQLAlchemyStorageBroker with session_scope "thread".
+
+    `progress` is called with a CopyProgress after each chunk is written.
+    With `checkpoint_path`, the number of chunks written without gaps is
+    saved there, and a later run skips that many chunks of the source
+    instead of writing them again; the file is removed once the copy is
+    complete. Resuming relies on the source returning the same chunks in the
+    same order. Chunks written after the checkpoint, out of order or in the
+    middle of a crash, are written again on resume.
+    """
+  source_broker: IStorageBroker
+  target_broker: IStorageBroker
+  read_params: Any
+  create_params: Callable[[Any], Any]
+  transform: Optional[Callable[[Any], Any]] = None
+  writers: int = 1
+  max_pending: Optional[int] = None
+  progress: Optional[Callable[[CopyProgress], None]] = None
+  checkpoint_path: Optional[str] = None
+
+  _lock: Any = field(init=False,
+                     default_factory=threading.Lock,
+                     repr=False,
+                     compare=False)
+  _stop: Any = field(init=False,
+                     default_factory=threading.Event,
+                     repr=False,
+                     compare=False)
+  _errors: list = field(init=False,
+                        default_factory=list,
+                        repr=False,
+                        compare=False)
+  # Rows of each chunk written past the first gap, by sequence number
+  _written: dict = field(init=False,
+                         default_factory=dict,
+                         repr=False,
+                         compare=False)
+  _contiguous: int = field(init=False, default=0, repr=False, compare=False)
+  _contiguous_rows: int = field(init=False,
+                                default=0,
+                                repr=False,
+                                compare=False)
+  _started: float = field(init=False, default=0.0, repr=False, compare=False)
+
+  def __post_init__(self):
+    if self.writers < 1:
+      raise ValueError("writers must be at least 1")
+    if self.max_pending is not None and self.max_pending < 1:
+      raise ValueError("max_pending must be at least 1")
+
+  def run(self):
+    """
+      Copy every chunk, returning the final CopyProgress. The first error
+      raised by the source or a writer stops the copy and is re-raised.
+      """
+    skip, rows = self._load_checkpoint()
+    if skip:
+      logger.info("Resuming copy after %s chunks (%s rows) from %s", skip,
+                  rows, self.checkpoint_path)
+    self._started = time.monotonic()
+    self._written.clear()
+    self._contiguous = skip
+    self._contiguous_rows = rows
+    self._errors.clear()
+    self._stop.clear()
+    pending = queue.Queue(maxsize=self.max_pending or 2 * self.writers)
+    threads = [
+        threading.Thread(target=self._write_chunks,
+                         args=(pending,),
+                         name=f"copy-writer-{number}",
+                         daemon=True) for number in range(self.writers)
+    ]
+    for thread in threads:
+      thread.start()
+    try:
+      source = SimpleStorageService(storage_broker=self.source_broker)
+      for sequence, chunk in enumerate(source.read(self.read_params)):
+        if sequence < skip:
+          continue
+        if not self._put(pending, (sequence, chunk)):
+          break
+    except BaseException as e:
+      self._stop.set()
+      self._errors.append(e)
+    finally:
+      # Writers drain the queue even after a failure, so this can't block
+      for _ in threads:
+        pending.put(_DONE)
+      for thread in threads:
+        thread.join()
+    if self._errors:
+      raise self._errors[0]
+    result = self._progress()
+    if self.checkpoint_path is not None and os.path.exists(
+        self.checkpoint_path):
+      os.remove(self.checkpoint_path)
+    logger.info("Copied %s chunks (%s rows) in %.1fs", result.chunks,
+                result.rows, result.elapsed)
+    return result
+
+  def _put(self, pending, item):
+    # Waits for room in the queue, giving up once a writer has failed
+    while not self._stop.is_set():
+      try:
+        pending.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def _write_chunks(self, pending):
+    target = SimpleStorageService(storage_broker=self.target_broker)
+    while True:
+      item = pending.get()
+      if item is _DONE:
+        return
+      if self._stop.is_set():
+        continue
+      sequence, chunk = item
+      try:
+        if self.transform is not None:
+          chunk = self.transform(chunk)
+        target.create(self.create_params(chunk))
+        self._chunk_written(sequence, len(chunk))
+      except BaseException as e:
+        logger.error("Writing chunk %s failed: %r", sequence, e)
+        self._stop.set()
+        with self._lock:
+          self._errors.append(e)
+
+  def _chunk_written(self, sequence, rows):
+    with self._lock:
+      self._written[sequence] = rows
+      advanced = False
+      while self._contiguous in self._written:
+        self._contiguous_rows += self._written.pop(self._contiguous)
+        self._contiguous += 1
+        advanced = True
+      if advanced and self.checkpoint_path is not None:
+        self._save_checkpoint()
+      progress = self._progress()
+    if self.progress is not None:
+      self.progress(progress)
+
+  def _progress(self):
+    return CopyProgress(chunks=self._contiguous + len(self._written),
+                        rows=self._contiguous_rows + sum(self._written.values()),
+                        elapsed=time.monotonic() - self._started)
+
+  def _load_checkpoint(self):
+    if self.checkpoint_path is None or not os.path.exists(
+        self.checkpoint_path):
+      return 0, 0
+    with open(self.checkpoint_path) as f:
+      state = json.load(f)
+    return state["chunks"], state["rows"]
+
+  def _save_checkpoint(self):
+    tmp_path = f"{self.checkpoint_path}.tmp"
+    with open(tmp_path, "w") as f:
+      json.dump({"chunks": self._contiguous, "rows": self._contiguous_rows}, f)
+    os.replace(tmp_path, self.checkpoint_path)
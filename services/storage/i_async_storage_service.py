@@ -0,0 +1,70 @@
+from abc import abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TypeVar
+
+# Models
+from models.storage.i_connect_params import IConnectParams
+from models.storage.i_create_params import ICreateParams
+from models.storage.i_read_params import IReadParams
+from models.storage.i_update_params import IUpdateParams
+from models.storage.i_delete_params import IDeleteParams
+
+# Broker
+from brokers.storage.i_async_storage_broker import IAsyncStorageBroker
+
+# Service
+from services.storage.i_storage_service import IStorageService
+
+# Define type variables bound to their expected classes
+TConnectParams = TypeVar('TConnectParams', bound=IConnectParams)
+TCreateParams = TypeVar('TCreateParams', bound=ICreateParams)
+TReadParams = TypeVar('TReadParams', bound=IReadParams)
+TUpdateParams = TypeVar('TUpdateParams', bound=IUpdateParams)
+TDeleteParams = TypeVar('TDeleteParams', bound=IDeleteParams)
+
+TAsyncStorageBroker = TypeVar('TAsyncStorageBroker', bound=IAsyncStorageBroker)
+
+
+@dataclass
+class IAsyncStorageService(IStorageService[
+    TAsyncStorageBroker,
+    TConnectParams,
+    TCreateParams,
+    TReadParams,
+    TUpdateParams,
+    TDeleteParams,
+]):
+  """
+    Async counterpart of IStorageService. Params are validated when the
+    method is called, before its coroutine is awaited, so a wrong params
+    type raises straight away.
+    """
+  storage_broker: TAsyncStorageBroker
+
+  _broker_interface = IAsyncStorageBroker
+
+  @asynccontextmanager
+  async def transaction(self):
+    async with self.storage_broker.transaction():
+      yield self
+
+  @abstractmethod
+  async def connect(self, params: TConnectParams):
+    pass
+
+  @abstractmethod
+  async def create(self, params: TCreateParams):
+    pass
+
+  @abstractmethod
+  async def read(self, params: TReadParams):
+    pass
+
+  @abstractmethod
+  async def update(self, params: TUpdateParams):
+    pass
+
+  @abstractmethod
+  async def delete(self, params: TDeleteParams):
+    pass
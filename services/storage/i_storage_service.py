@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field, fields, is_dataclass, asdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, is_dataclass
 import inspect
-from typing import TypeVar, Generic
+import types
+from typing import TypeVar, Generic, Union, get_args, get_origin
 
 # Models
 from models.storage.i_connect_params import IConnectParams
@@ -37,18 +39,46 @@ class IStorageService(ABC, Generic[
   # We'll store method -> param-type annotation here
   _method_type_map: dict = field(init=False, default_factory=dict)
 
+  # Method name -> cached validating wrapper around the service method
+  _wrappers: dict = field(init=False,
+                          default_factory=dict,
+                          repr=False,
+                          compare=False)
+
+  # The broker interface this service wraps
+  _broker_interface = IStorageBroker
+
   def __post_init__(self):
+    self._bind_broker()
+
+  def __setattr__(self, name, value):
+    # Swapping the broker invalidates the annotations the wrappers check
+    rebind = name == "storage_broker" and "_wrappers" in self.__dict__
+    if rebind:
+      self._check_broker(value)
+    super().__setattr__(name, value)
+    if rebind:
+      self._bind_broker()
+
+  def _check_broker(self, storage_broker):
+    if not isinstance(storage_broker, self._broker_interface):
+      raise TypeError("Invalid storage broker. It must be a subclass of "
+                      f"{self._broker_interface.__name__}.")
+
+  def _bind_broker(self):
     """
-      Extract parameter annotations from each method in the storage broker,
-      using inspect.signature instead of get_type_hints.
+      Extract parameter annotations from each public method in the storage
+      broker, using inspect.signature instead of get_type_hints, and build
+      one validating wrapper per method.
       """
-    if not isinstance(self.storage_broker, IStorageBroker):
-      raise TypeError(
-          "Invalid storage broker. It must be a subclass of IStorageBroker.")
+    self._check_broker(self.storage_broker)
 
+    method_type_map = {}
     # Inspect the broker's class, grabbing each function
     for name, func in inspect.getmembers(self.storage_broker.__class__,
                                          inspect.isfunction):
+      if name.startswith("_"):
+        continue
       # We'll parse the signature to see if there's an annotation on param 'params'
       sig = inspect.signature(func)
       params = list(sig.parameters.values())
@@ -60,16 +90,77 @@ class IStorageService(ABC, Generic[
         # If there's a recognized annotation (not just inspect._empty),
         # store it in _method_type_map
         if annotation != inspect._empty:
-          self._method_type_map[name] = annotation
+          method_type_map[name] = annotation
+
+    wrappers = {}
+    for name, expected_type in method_type_map.items():
+      # Call through the service so subclasses can add behaviour; fall back
+      # to the broker for methods the service doesn't define
+      if hasattr(type(self), name):
+        method = object.__getattribute__(self, name)
+      else:
+        method = getattr(self.storage_broker, name)
+      wrappers[name] = self._make_wrapper(method, expected_type)
+
+    self._method_type_map = method_type_map
+    self._wrappers = wrappers
+
+  def _make_wrapper(self, method, expected_type):
+    expected_types = self._expected_types(expected_type)
+    # The check only depends on the params class, so each class is
+    # validated once and later calls cost a set lookup
+    validated = set()
+
+    def wrapper(params, *args, **kwargs):
+      params_type = type(params)
+      if params_type not in validated:
+        self._validate_params(params, expected_types)
+        validated.add(params_type)
+      return method(params, *args, **kwargs)
+
+    return wrapper
+
+  @staticmethod
+  def _expected_types(expected_type):
+    # Brokers accepting several params types annotate them as a Union
+    if get_origin(expected_type) in (Union, types.UnionType):
+      return get_args(expected_type)
+    return (expected_type, )
+
+  @property
+  def metrics(self):
+    """
+      Per-operation metrics of the wrapped broker.
+      """
+    return self.storage_broker.metrics
+
+  @contextmanager
+  def transaction(self):
+    """
+      Unit of work on the wrapped broker, yielding this service. Operations
+      in the block are committed together when it exits, or rolled back if
+      it raises.
+      """
+    with self.storage_broker.transaction():
+      yield self
 
   def _validate_params(self, params, expected_type):
-    if not isinstance(params, expected_type):
-      raise TypeError(f"Expected parameter of type {expected_type.__name__}, "
+    if isinstance(expected_type, tuple):
+      expected_types = expected_type
+    else:
+      expected_types = self._expected_types(expected_type)
+
+    matched = [t for t in expected_types if isinstance(params, t)]
+    if not matched:
+      expected_names = " or ".join(t.__name__ for t in expected_types)
+      raise TypeError(f"Expected parameter of type {expected_names}, "
                       f"but got {type(params).__name__}")
+    expected_type = matched[0]
 
     # If it's a dataclass, gather field names without constructing an instance
     if is_dataclass(params):
-      param_keys = set(asdict(params).keys())
+      # Read field names off the dataclass; asdict would deep-copy the payload
+      param_keys = set(f.name for f in fields(params))
       expected_keys = set(f.name for f in fields(
           expected_type))  # <--- This avoids calling expected_type()
 
@@ -82,26 +173,18 @@ class IStorageService(ABC, Generic[
     """
       Intercepts method calls to ensure parameter validation runs automatically.
       """
-    # Let normal logic handle private attrs (including _method_type_map)
-    if name.startswith("_"):
-      return super().__getattribute__(name)
-
-    storage_broker = super().__getattribute__("storage_broker")
-    method_type_map = super().__getattribute__("_method_type_map")
-
-    # If the name appears in the param-type map and there's a corresponding broker method:
-    if name in method_type_map and hasattr(storage_broker, name):
-      broker_method = getattr(storage_broker, name)
-
-      def wrapper(params, *args, **kwargs):
-        expected_type = method_type_map[name]
-        self._validate_params(params, expected_type)
-        return broker_method(params, *args, **kwargs)
-
+    # Let normal logic handle private attrs (including _wrappers)
+    if name[0] == "_":
+      return object.__getattribute__(self, name)
+
+    # Validating wrappers are built once per broker in _bind_broker
+    wrapper = object.__getattribute__(self, "__dict__").get(
+        "_wrappers", {}).get(name)
+    if wrapper is not None:
       return wrapper
 
     # Otherwise, let standard attribute lookup occur
-    return super().__getattribute__(name)
+    return object.__getattribute__(self, name)
 
   @abstractmethod
   def connect(self, params: TConnectParams):
@@ -0,0 +1,229 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, TypeVar
+
+# Models
+from models.storage.i_connect_params import IConnectParams
+from models.storage.i_create_params import ICreateParams
+from models.storage.i_read_params import IReadParams
+from models.storage.i_update_params import IUpdateParams
+from models.storage.i_delete_params import IDeleteParams
+
+# Broker
+from brokers.storage.i_storage_broker import (
+    IStorageBroker,
+    TransactionNotSupportedError,
+)
+
+# Service
+from services.storage.i_storage_service import IStorageService
+from services.storage.simple_storage_service import SimpleStorageService
+
+logger = logging.getLogger(__name__)
+
+# Define type variables bound to their expected classes
+TConnectParams = TypeVar('TConnectParams', bound=IConnectParams)
+TCreateParams = TypeVar('TCreateParams', bound=ICreateParams)
+TReadParams = TypeVar('TReadParams', bound=IReadParams)
+TUpdateParams = TypeVar('TUpdateParams', bound=IUpdateParams)
+TDeleteParams = TypeVar('TDeleteParams', bound=IDeleteParams)
+
+TStorageBroker = TypeVar('TStorageBroker', bound=IStorageBroker)
+
+READ_MODES = ("preferred", "fastest")
+
+
+class ReplicationError(Exception):
+  """
+    Too few replicas succeeded. `errors` maps each failed replica's name to
+    the exception it raised.
+    """
+
+  def __init__(self, message, errors):
+    super().__init__(message)
+    self.errors = errors
+
+
+@dataclass
+class Replica:
+  storage_broker: IStorageBroker
+  # Turns the service's params into params for this broker, so a replica
+  # can be a different kind of store than the primary
+  adapt: Optional[Callable[[Any], Any]] = None
+  serve_reads: bool = True
+  name: Optional[str] = None
+
+
+@dataclass
+class _Member:
+  name: str
+  replica: Replica
+  service: SimpleStorageService
+  # One worker per replica keeps its operations in the order they were sent
+  executor: ThreadPoolExecutor
+
+
+@dataclass
+class ReplicatedStorageService(IStorageService[
+    TStorageBroker,
+    TConnectParams,
+    TCreateParams,
+    TReadParams,
+    TUpdateParams,
+    TDeleteParams,
+]):
+  """
+    Mirrors every write to `storage_broker` (the primary) and `replicas`.
+
+    Writes run on all of them at once and return when `write_quorum` of them
+    (all by default) have succeeded, with the result of the first one listed
+    among those. Slower replicas finish in the background, still in order.
+    If the quorum can't be reached, ReplicationError is raised, or
+    TimeoutError once `timeout` seconds have passed.
+
+    With `read_mode` "preferred", reads go to the first replica serving
+    reads, falling back to the next one on errors; with "fastest" they go to
+    all of them and the first answer wins. Reads are queued behind the
+    replica's pending writes, so each replica reads its own writes.
+    """
+  storage_broker: TStorageBroker
+  replicas: List[Replica] = field(default_factory=list)
+  write_quorum: Optional[int] = None
+  timeout: Optional[float] = None
+  read_mode: str = "preferred"
+
+  _members: list = field(init=False,
+                         default_factory=list,
+                         repr=False,
+                         compare=False)
+
+  def __post_init__(self):
+    super().__post_init__()
+    if self.read_mode not in READ_MODES:
+      raise ValueError(f"Unknown read_mode '{self.read_mode}', "
+                       f"expected one of {READ_MODES}")
+    replicas = [Replica(self.storage_broker, name="primary"), *self.replicas]
+    if self.write_quorum is not None and not (
+        1 <= self.write_quorum <= len(replicas)):
+      raise ValueError(
+          f"write_quorum must be between 1 and {len(replicas)}")
+    if not any(replica.serve_reads for replica in replicas):
+      raise ValueError("At least one replica must serve reads")
+    self._members = [
+        _Member(
+            name=replica.name or
+            f"{type(replica.storage_broker).__name__}-{number}",
+            replica=replica,
+            service=SimpleStorageService(
+                storage_broker=replica.storage_broker),
+            executor=ThreadPoolExecutor(max_workers=1),
+        ) for number, replica in enumerate(replicas)
+    ]
+
+  def transaction(self):
+    raise TransactionNotSupportedError(
+        "Transactions can't span replicas; open one on a replica's broker "
+        "to group writes to that replica alone.")
+
+  def connect(self, params: TConnectParams):
+    return self._write("connect", params, quorum=len(self._members))
+
+  def create(self, params: TCreateParams):
+    return self._write("create", params)
+
+  def read(self, params: TReadParams):
+    members = [m for m in self._members if m.replica.serve_reads]
+    if self.read_mode == "fastest":
+      return self._read_fastest(members, params)
+    error = None
+    for member in members:
+      future = member.executor.submit(self._call, member, "read", params)
+      try:
+        return future.result(timeout=self.timeout)
+      except Exception as e:
+        logger.warning("Read from replica %s failed: %r", member.name, e)
+        error = e
+    raise error
+
+  def update(self, params: TUpdateParams):
+    return self._write("update", params)
+
+  def delete(self, params: TDeleteParams):
+    return self._write("delete", params)
+
+  def close(self):
+    """
+      Wait for writes still running on slower replicas and stop the workers.
+      """
+    for member in self._members:
+      member.executor.shutdown()
+
+  @staticmethod
+  def _call(member, method, params):
+    if member.replica.adapt is not None:
+      params = member.replica.adapt(params)
+    return getattr(member.service, method)(params)
+
+  def _write(self, method, params, quorum=None):
+    quorum = quorum or self.write_quorum or len(self._members)
+    futures = {
+        member.executor.submit(self._call, member, method, params): number
+        for number, member in enumerate(self._members)
+    }
+    results = {}
+    errors = {}
+    try:
+      for future in as_completed(futures, timeout=self.timeout):
+        member = self._members[futures[future]]
+        try:
+          results[futures[future]] = future.result()
+        except Exception as e:
+          logger.warning("%s on replica %s failed: %r", method, member.name,
+                         e)
+          errors[member.name] = e
+          if len(self._members) - len(errors) < quorum:
+            raise ReplicationError(
+                f"{method} failed on {len(errors)} of {len(self._members)} "
+                f"replicas, so the quorum of {quorum} can't be reached",
+                errors) from e
+        else:
+          if len(results) >= quorum:
+            break
+    except FuturesTimeoutError:
+      raise TimeoutError(
+          f"Only {len(results)} of {quorum} replicas needed finished "
+          f"{method} within {self.timeout}s") from None
+    finally:
+      for future, number in futures.items():
+        if not future.done():
+          future.add_done_callback(
+              lambda f, name=self._members[number].name: self._log_late(
+                  method, name, f))
+    return results[min(results)]
+
+  def _read_fastest(self, members, params):
+    futures = {
+        member.executor.submit(self._call, member, "read", params): member
+        for member in members
+    }
+    errors = {}
+    try:
+      for future in as_completed(futures, timeout=self.timeout):
+        try:
+          return future.result()
+        except Exception as e:
+          logger.warning("Read from replica %s failed: %r",
+                         futures[future].name, e)
+          errors[futures[future].name] = e
+    except FuturesTimeoutError:
+      raise TimeoutError(
+          f"No replica answered read within {self.timeout}s") from None
+    raise ReplicationError("read failed on every replica", errors)
+
+  @staticmethod
+  def _log_late(method, name, future):
+    if not future.cancelled() and future.exception() is not None:
+      logger.error("%s on replica %s failed after the write returned: %r",
+                   method, name, future.exception())
@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from typing import TypeVar
+
+# Models
+from models.storage.i_connect_params import IConnectParams
+from models.storage.i_create_params import ICreateParams
+from models.storage.i_read_params import IReadParams
+from models.storage.i_update_params import IUpdateParams
+from models.storage.i_delete_params import IDeleteParams
+
+# Broker
+from brokers.storage.i_async_storage_broker import IAsyncStorageBroker
+
+# Service
+from services.storage.i_async_storage_service import IAsyncStorageService
+
+# Define type variables bound to their expected classes
+TConnectParams = TypeVar('TConnectParams', bound=IConnectParams)
+TCreateParams = TypeVar('TCreateParams', bound=ICreateParams)
+TReadParams = TypeVar('TReadParams', bound=IReadParams)
+TUpdateParams = TypeVar('TUpdateParams', bound=IUpdateParams)
+TDeleteParams = TypeVar('TDeleteParams', bound=IDeleteParams)
+
+TAsyncStorageBroker = TypeVar('TAsyncStorageBroker', bound=IAsyncStorageBroker)
+
+
+@dataclass
+class SimpleAsyncStorageService(IAsyncStorageService[
+    TAsyncStorageBroker,
+    TConnectParams,
+    TCreateParams,
+    TReadParams,
+    TUpdateParams,
+    TDeleteParams,
+]):
+  storage_broker: TAsyncStorageBroker
+
+  async def connect(self, params: TConnectParams):
+    return await self.storage_broker.connect(params=params)
+
+  async def create(self, params: TCreateParams):
+    return await self.storage_broker.create(params=params)
+
+  async def read(self, params: TReadParams):
+    return await self.storage_broker.read(params=params)
+
+  async def update(self, params: TUpdateParams):
+    return await self.storage_broker.update(params=params)
+
+  async def delete(self, params: TDeleteParams):
+    return await self.storage_broker.delete(params=params)